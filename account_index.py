@@ -0,0 +1,100 @@
+import os
+import json
+import time
+
+SAVE_INTERVAL = 600  # Seconds between saves when only last-seen times changed
+
+class AccountIndex:
+    """accountName -> characters played on it, kept up to date from player snapshots.
+
+    Players with hideAccountName set are never linked to their account, and any
+    link recorded before they hid it is forgotten.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.accounts = {}  # Lowercased account -> {"name": accountName, "characters": {characterName: last seen syncTime}}
+        self.characters = {}  # characterName -> lowercased account
+        self.online = {}  # Lowercased account -> characters online in the latest snapshot
+        self.version = None  # Snapshot version the index was last updated from
+        self.dirty = False
+        self.saved = time.monotonic()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                self.accounts = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.accounts = {}
+        self.characters = {
+            character: key for key, entry in self.accounts.items() for character in entry["characters"]
+        }
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.accounts, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        self.saved = time.monotonic()
+
+    def forget(self, character):
+        key = self.characters.pop(character, None)
+        if key is None:
+            return False
+        entry = self.accounts[key]
+        entry["characters"].pop(character, None)
+        if not entry["characters"]:
+            del self.accounts[key]
+        return True
+
+    def update(self, player_data, version):
+        """Apply one snapshot; returns True when a link was added or removed."""
+        if version is not None and version == self.version:
+            return False
+        sync_time = player_data.get("syncTime")
+        links_changed = False
+        online = {}
+        for player in player_data.get("players", []):
+            character = player.get("characterName")
+            account = player.get("accountName")
+            if not character:
+                continue
+            if player.get("hideAccountName") or not account:
+                links_changed |= self.forget(character)
+                continue
+            key = account.lower()
+            if self.characters.get(character) != key:
+                self.forget(character)  # Character names are unique, a new owner replaces the old link
+                self.characters[character] = key
+                links_changed = True
+            entry = self.accounts.setdefault(key, {"name": account, "characters": {}})
+            entry["name"] = account
+            entry["characters"][character] = sync_time
+            online.setdefault(key, []).append(character)
+        self.online = online
+        self.version = version
+        self.dirty = True
+        return links_changed
+
+    def save_if_needed(self, force=False):
+        if self.dirty and (force or time.monotonic() - self.saved >= SAVE_INTERVAL):
+            self.save()
+
+    def account_of(self, character):
+        key = self.characters.get(character)
+        return self.accounts[key]["name"] if key is not None else None
+
+    def online_characters(self, account):
+        return self.online.get(account.lower(), [])
+
+    def lookup(self, name):
+        """(accountName, online characters, [(character, last seen)] newest first) for an account or one of its characters."""
+        key = name.lower()
+        if key not in self.accounts:
+            key = self.characters.get(name)
+            if key is None:
+                return None
+        entry = self.accounts[key]
+        history = sorted(entry["characters"].items(), key=lambda item: item[1] or "", reverse=True)
+        return entry["name"], self.online.get(key, []), history
@@ -0,0 +1,54 @@
+import sys
+import json
+import argparse
+
+# Compare two bench.run result files case by case:
+#   python -m bench.compare bench-base.json bench-results.json --threshold 0.1
+# Exits with status 1 when a case got slower than the threshold or changed its message count.
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare(base, new, threshold, metric="median"):
+    """Rows of (case, base seconds, new seconds, relative change, flag)."""
+    rows = []
+    for case in sorted(set(base["results"]) | set(new["results"])):
+        old_result = base["results"].get(case)
+        new_result = new["results"].get(case)
+        if old_result is None or new_result is None:
+            rows.append((case, old_result and old_result[metric], new_result and new_result[metric], None, "missing"))
+            continue
+        change = (new_result[metric] - old_result[metric]) / old_result[metric] if old_result[metric] else 0.0
+        flag = ""
+        if old_result.get("messages") != new_result.get("messages"):
+            flag = f"messages {old_result.get('messages')} -> {new_result.get('messages')}"
+        elif change > threshold:
+            flag = "slower"
+        elif change < -threshold:
+            flag = "faster"
+        rows.append((case, old_result[metric], new_result[metric], change, flag))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.1, help="Relative change reported as a regression")
+    parser.add_argument('--metric', choices=("min", "median", "p95", "mean"), default="median")
+    args = parser.parse_args(argv)
+
+    base, new = load_results(args.base), load_results(args.new)
+    print(f"{base['meta'].get('revision')} -> {new['meta'].get('revision')} ({args.metric}, ms)")
+    regressions = 0
+    for case, old_value, new_value, change, flag in compare(base, new, args.threshold, args.metric):
+        old_text = f"{old_value * 1000:10.2f}" if old_value is not None else f"{'-':>10}"
+        new_text = f"{new_value * 1000:10.2f}" if new_value is not None else f"{'-':>10}"
+        change_text = f"{change:+8.1%}" if change is not None else f"{'':>8}"
+        print(f"{case:<45} {old_text} {new_text} {change_text}  {flag}")
+        if flag == "slower" or flag.startswith("messages"):
+            regressions += 1
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
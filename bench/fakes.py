@@ -0,0 +1,87 @@
+import asyncio
+
+class VirtualClock:
+    """Simulated time for replays; fake API calls advance it instead of sleeping."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class FakeChannel:
+    """Stand-in for a discord.TextChannel that records what would have been sent."""
+
+    def __init__(self, channel_id, latency=0.0, clock=None):
+        self.id = channel_id
+        self.latency = latency  # Simulated API round trip per send
+        self.clock = clock
+        self.sent = []
+        self.sent_at = []  # Virtual send times when running on a clock
+
+    async def send(self, content=None, **kwargs):
+        if self.clock is not None:
+            self.clock.advance(self.latency)
+            self.sent_at.append(self.clock.now)
+        elif self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append((content, kwargs))
+        return len(self.sent)
+
+class FakeClient:
+    """Resolves any channel id to a FakeChannel, replacing bot.get_channel."""
+
+    def __init__(self, latency=0.0, clock=None):
+        self.latency = latency
+        self.clock = clock
+        self.channels = {}
+
+    def get_channel(self, channel_id):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(channel_id, self.latency, self.clock)
+        return self.channels[channel_id]
+
+    @property
+    def messages_sent(self):
+        return sum(len(channel.sent) for channel in self.channels.values())
+
+    def reset(self):
+        for channel in self.channels.values():
+            channel.sent.clear()
+            channel.sent_at.clear()
+
+class FakeGuild:
+    def __init__(self, guild_id, name="Synthetic Guild"):
+        self.id = guild_id
+        self.name = name
+
+class FakeCommand:
+    def __init__(self, name):
+        self.name = name
+        self.qualified_name = name
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+        self.deferred = False
+
+    def is_done(self):
+        return self.deferred or bool(self.messages)
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append((content, kwargs))
+
+    async def defer(self, **kwargs):
+        self.deferred = True
+
+class FakeInteraction:
+    """Just enough of discord.Interaction for check_guild and command bodies."""
+
+    def __init__(self, guild_id, channel_id, command="online", interaction_id=1):
+        self.id = interaction_id
+        self.guild = FakeGuild(guild_id)
+        self.guild_id = guild_id
+        self.channel = FakeChannel(channel_id)
+        self.command = FakeCommand(command)
+        self.response = FakeResponse()
+        self.followup = FakeChannel(channel_id)
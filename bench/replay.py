@@ -0,0 +1,296 @@
+import os
+import re
+import sys
+import json
+import time
+import heapq
+import asyncio
+import random
+import logging
+import argparse
+import tempfile
+import contextlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+# Offline replay of recorded player snapshots and forum files through the real
+# producer (setup_db.save_snapshot, forum_monitor.save_replies_to_file) and bot
+# (check_watchlists_once, run_replies_pass) code on a virtual clock:
+#   python -m bench.replay synthesize recording.jsonl --hours 6
+#   python -m bench.replay run recording.jsonl --latency 0.15 --output replay.json
+#
+# A recording is JSON lines: one {"type": "setup", "config": ..., "watchlists": ...}
+# line, then events ordered by "t" (seconds from the start):
+#   {"t": 0, "type": "snapshot", "data": <player_list.json contents>}
+#   {"t": 245, "type": "forum", "topic_id": "123", "replies": <forum_123.json contents>}
+#   {"t": 230, "type": "posted", "topic_id": "123", "id": 456}   (optional, synthetic only)
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from bench import synthetic
+from bench.fakes import FakeClient, VirtualClock
+
+WATCHLIST_INTERVAL = 30  # Matches the sleeps in bot.check_watchlists and bot.monitor_replies
+REPLIES_INTERVAL = 60
+PER_PAGE = 15
+WATCHLIST_MESSAGE = re.compile(r"\*\*(.+)\*\* is now online!")
+REPLY_LINK = re.compile(r"comment=(\d+)")
+
+def distribution(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {"count": len(ordered), "mean": sum(ordered) / len(ordered), "p50": pick(0.5),
+            "p90": pick(0.9), "p99": pick(0.99), "max": ordered[-1]}
+
+def read_recording(path):
+    with open(path) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    setup = next(line for line in lines if line["type"] == "setup")
+    events = sorted((line for line in lines if line["type"] != "setup"), key=lambda event: event["t"])
+    return setup, events
+
+def expected_notifications(setup, events):
+    """What the bot should send: (route, channel id, key) -> list of times the trigger became visible."""
+    config, watchlists = setup["config"], setup["watchlists"]
+    expected = defaultdict(list)
+    online_state = defaultdict(bool)  # (guild, player) -> online in the previous snapshot
+    seen_replies = defaultdict(set)
+    topic_channels = defaultdict(list)
+    for guild_id, guild in config.items():
+        if guild.get("topic_id") and guild.get("notification_channel_id"):
+            topic_channels[str(guild["topic_id"])].append(guild["notification_channel_id"])
+
+    for event in events:
+        if event["type"] == "snapshot":
+            online = {player.get("characterName") for player in event["data"].get("players", [])}
+            for guild_id, watchlist in watchlists.items():
+                channel_id = config.get(guild_id, {}).get("notification_channel_id")
+                for player in watchlist:
+                    is_online = player in online
+                    if is_online and not online_state[(guild_id, player)] and channel_id:
+                        expected[("watchlist", int(channel_id), player)].append(event["t"])
+                    online_state[(guild_id, player)] = is_online
+        elif event["type"] == "forum":
+            topic_id = str(event["topic_id"])
+            for reply in event["replies"]:
+                reply_id = int(reply["id"])
+                if reply_id in seen_replies[topic_id]:
+                    continue
+                seen_replies[topic_id].add(reply_id)
+                for channel_id in topic_channels[topic_id]:
+                    expected[("forum", int(channel_id), reply_id)].append(event["t"])
+    posted = [(str(event["topic_id"]), int(event["id"])) for event in events if event["type"] == "posted"]
+    undetected = [reply for reply in posted if reply[1] not in seen_replies[reply[0]]]
+    return expected, len(posted), len(undetected)
+
+def sent_notifications(client):
+    """Yield (route, channel id, key, virtual send time) for every fake API call."""
+    for channel in client.channels.values():
+        for (content, kwargs), sent_at in zip(channel.sent, channel.sent_at):
+            if content:
+                match = WATCHLIST_MESSAGE.search(content)
+                if match:
+                    yield ("watchlist", channel.id, match.group(1), sent_at)
+                    continue
+            embeds = list(kwargs.get("embeds") or []) + ([kwargs["embed"]] if kwargs.get("embed") else [])
+            for embed in embeds:
+                texts = [embed.url or "", embed.description or ""] + [str(field.value) for field in embed.fields]
+                for reply_id in {int(found) for found in REPLY_LINK.findall(" ".join(texts))}:
+                    yield ("forum", channel.id, reply_id, sent_at)
+
+def score(expected, client):
+    """Match sends to expected notifications; unmatched sends are duplicates, unmatched expectations missed."""
+    pending = {key: sorted(times) for key, times in expected.items()}
+    latencies = defaultdict(list)
+    duplicates = defaultdict(int)
+    for route, channel_id, key, sent_at in sorted(sent_notifications(client), key=lambda sent: sent[3]):
+        times = pending.get((route, channel_id, key))
+        if times and times[0] <= sent_at:
+            latencies[route].append(sent_at - times.pop(0))
+        else:
+            duplicates[route] += 1
+    missed = defaultdict(int)
+    for (route, _, _), times in pending.items():
+        missed[route] += len(times)
+    return latencies, duplicates, missed
+
+def load_pipeline(client):
+    """Import the producer and bot modules inside the replay workspace."""
+    os.environ.setdefault('DISCORD_TOKEN', 'replay')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import bot
+        import setup_db
+        import forum_monitor
+    logging.getLogger().setLevel(logging.WARNING)
+    bot.bot.get_channel = client.get_channel
+    return bot, setup_db, forum_monitor
+
+async def replay(recording, latency=0.1, watchlist_interval=WATCHLIST_INTERVAL, replies_interval=REPLIES_INTERVAL):
+    setup, events = read_recording(recording)
+    clock = VirtualClock()
+    client = FakeClient(latency=latency, clock=clock)
+    cpu = defaultdict(float)
+    ticks = defaultdict(int)
+    original_dir = os.getcwd()
+
+    with tempfile.TemporaryDirectory(prefix='lsrp-replay-') as workspace:
+        os.makedirs(os.path.join(workspace, 'data'))
+        with open(os.path.join(workspace, 'bot_config.json'), 'w') as f:
+            json.dump(setup["config"], f)
+        with open(os.path.join(workspace, 'data', 'watchlists.json'), 'w') as f:
+            json.dump(setup["watchlists"], f)
+        os.chdir(workspace)
+        try:
+            bot, setup_db, forum_monitor = load_pipeline(client)
+            bot.watchlist_last_online_status.clear()
+            bot.player_data_cache["version"] = None
+
+            # Discrete event queue: recorded producer writes plus the bot's own polling loops
+            queue = [(event["t"], index, event["type"], event) for index, event in enumerate(events)]
+            start = events[0]["t"] if events else 0.0
+            end = events[-1]["t"] if events else 0.0
+            queue += [(start, -2, "watchlist_tick", None), (start, -1, "replies_tick", None)]
+            heapq.heapify(queue)
+            sequence = len(events)
+            last_evaluated = None
+            seen_replies = {}
+
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                while queue:
+                    at, _, kind, event = heapq.heappop(queue)
+                    if at > end + max(watchlist_interval, replies_interval):
+                        break
+                    if kind == "posted":
+                        continue  # Only used for scoring
+                    cpu_start = time.process_time()
+                    if kind == "snapshot":
+                        setup_db.save_snapshot(event["data"])
+                    elif kind == "forum":
+                        forum_monitor.save_replies_to_file(event["replies"], event["topic_id"])
+                    elif kind in ("watchlist_tick", "replies_tick"):
+                        # The bot runs one loop iteration at a time; time spent in it delays the next one
+                        clock.now = max(clock.now, at)
+                        if kind == "watchlist_tick":
+                            last_evaluated = await bot.check_watchlists_once(last_evaluated)
+                        else:
+                            await bot.run_replies_pass(bot.load_config(), seen_replies)
+                        elapsed = time.process_time() - cpu_start
+                        clock.advance(elapsed)
+                        interval = watchlist_interval if kind == "watchlist_tick" else replies_interval
+                        sequence += 1
+                        heapq.heappush(queue, (clock.now + interval, sequence, kind, None))
+                        ticks[kind] += 1
+                    cpu["producer" if kind in ("snapshot", "forum") else "bot"] += time.process_time() - cpu_start
+        finally:
+            os.chdir(original_dir)
+
+    expected, posted, undetected = expected_notifications(setup, events)
+    latencies, duplicates, missed = score(expected, client)
+    simulated_hours = max(end - start, 1.0) / 3600
+    return {
+        "recording": recording,
+        "simulated_seconds": end - start,
+        "api_latency": latency,
+        "api_calls": client.messages_sent,
+        "ticks": dict(ticks),
+        "routes": {
+            route: {
+                "expected": sum(len(times) for key, times in expected.items() if key[0] == route),
+                "latency": distribution(latencies[route]),
+                "duplicates": duplicates[route],
+                "missed": missed[route],
+            }
+            for route in ("watchlist", "forum")
+        },
+        "forum_replies_posted": posted,
+        "forum_replies_never_fetched": undetected,
+        "cpu_seconds": dict(cpu),
+        "cpu_seconds_per_simulated_hour": {role: seconds / simulated_hours for role, seconds in cpu.items()},
+    }
+
+def synthesize(path, hours=2.0, players=1000, guilds=200, topics=20, watchlist_size=25, sync_period=120,
+               churn=0.05, forum_poll=240, replies_per_hour=4, seed=0):
+    """Write a synthetic recording: player churn every sync and forum posts polled like forum_monitor."""
+    rng = random.Random(seed)
+    pool = synthetic.make_players(players * 2, seed)
+    online = set(range(players))
+    config = synthetic.make_config(guilds, topics)
+    watchlists = synthetic.make_watchlists(config, pool, watchlist_size, online_fraction=1.0, seed=seed)
+    duration = hours * 3600
+    base = datetime(2024, 10, 28, 9, 0, tzinfo=timezone.utc)
+    events = []
+
+    t = 0.0
+    while t <= duration:
+        leaving = rng.sample(sorted(online), int(len(online) * churn))
+        joining = rng.sample(sorted(set(range(len(pool))) - online), len(leaving))
+        online = (online - set(leaving)) | set(joining)
+        sync_time = base + timedelta(seconds=t)
+        data = {"syncTime": sync_time.strftime('%Y-%m-%dT%H:%M:%S.000Z'), "players": [pool[index] for index in sorted(online)]}
+        events.append({"t": t, "type": "snapshot", "data": data})
+        t += sync_period
+
+    for topic in range(topics):
+        topic_id = str(10000 + topic)
+        replies = synthetic.make_forum_replies(topic_id, PER_PAGE, seed=seed)
+        next_id = replies[-1]["id"] + 1
+        post_times = []
+        t = rng.expovariate(replies_per_hour / 3600)
+        while t <= duration:
+            post_times.append(t)
+            t += rng.expovariate(replies_per_hour / 3600)
+        template = synthetic.make_forum_replies(topic_id, len(post_times), first_id=next_id, seed=seed + 1)
+        posted = list(zip(post_times, template))
+        for posted_at, reply in posted:
+            events.append({"t": posted_at, "type": "posted", "topic_id": topic_id, "id": reply["id"]})
+
+        # forum_monitor only fetches the last page, so replies can roll over onto a page it never reads
+        poll = rng.uniform(0, forum_poll)
+        while poll <= duration:
+            visible = replies + [reply for posted_at, reply in posted if posted_at <= poll]
+            last_page = visible[(len(visible) - 1) // PER_PAGE * PER_PAGE:]
+            events.append({"t": poll, "type": "forum", "topic_id": topic_id, "replies": last_page})
+            poll += forum_poll + rng.uniform(0, 10)
+
+    events.sort(key=lambda event: event["t"])
+    with open(path, 'w') as f:
+        f.write(json.dumps({"type": "setup", "config": config, "watchlists": watchlists}) + "\n")
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+    print(f"Wrote {len(events)} events covering {hours}h to {path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded producer output through the bot on a virtual clock.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument('recording')
+    run_parser.add_argument('--latency', type=float, default=0.1, help="Simulated seconds per Discord API call")
+    run_parser.add_argument('--watchlist-interval', type=float, default=WATCHLIST_INTERVAL)
+    run_parser.add_argument('--replies-interval', type=float, default=REPLIES_INTERVAL)
+    run_parser.add_argument('--output')
+    synth_parser = commands.add_parser("synthesize")
+    synth_parser.add_argument('recording')
+    synth_parser.add_argument('--hours', type=float, default=2.0)
+    synth_parser.add_argument('--players', type=int, default=1000)
+    synth_parser.add_argument('--guilds', type=int, default=200)
+    synth_parser.add_argument('--topics', type=int, default=20)
+    synth_parser.add_argument('--watchlist', type=int, default=25)
+    synth_parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "synthesize":
+        synthesize(args.recording, hours=args.hours, players=args.players, guilds=args.guilds,
+                   topics=args.topics, watchlist_size=args.watchlist, seed=args.seed)
+        return
+
+    report = asyncio.run(replay(args.recording, args.latency, args.watchlist_interval, args.replies_interval))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import inspect
+import logging
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime, timezone
+
+# Synthetic-load benchmarks for the bot's hot paths, run from the repository root:
+#   python -m bench.run --players 500,5000,20000 --guilds 2000 --output bench-results.json
+#   python -m bench.compare bench-base.json bench-results.json
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from bench import synthetic
+from bench.fakes import FakeClient, FakeInteraction
+
+def summarize(times, messages):
+    ordered = sorted(times)
+    return {
+        "iterations": len(ordered),
+        "min": ordered[0],
+        "median": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "mean": sum(ordered) / len(ordered),
+        "messages": messages,  # Sends per iteration, a change here means behaviour changed
+    }
+
+async def measure(func, iterations, client, setup=None, warmup=2):
+    """Time `func` (sync or async) after a few warmup runs; `setup` runs untimed before each call."""
+    async def call():
+        result = func()
+        if inspect.isawaitable(result):
+            await result
+
+    for _ in range(warmup):
+        if setup:
+            setup()
+        await call()
+    times = []
+    messages = 0
+    for _ in range(iterations):
+        if setup:
+            setup()
+        client.reset()
+        start = time.perf_counter()
+        await call()
+        times.append(time.perf_counter() - start)
+        messages = client.messages_sent
+    return summarize(times, messages)
+
+def import_bot(client):
+    """Import bot.py without connecting to Discord and point its channel lookups at `client`."""
+    os.environ.setdefault('DISCORD_TOKEN', 'bench')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import bot
+    logging.getLogger().setLevel(logging.WARNING)
+    bot.bot.get_channel = client.get_channel
+    return bot
+
+def size_cases(bot):
+    """Cases whose cost depends on the number of online players."""
+    def reset_player_cache():
+        bot.player_data_cache["version"] = None
+
+    def reset_online_pages():
+        bot.response_cache.clear()
+        bot.flag_index_cache["version"] = None
+
+    async def watchlist_pass():
+        watchlists = bot.load_watchlists()
+        settings = bot.load_config()
+        await bot.run_watchlist_pass(watchlists, settings, set(bot.get_online_names()))
+
+    return [
+        ("load_player_data_cold", lambda: bot.load_player_data(), reset_player_cache),
+        ("load_player_data_cached", lambda: bot.load_player_data(), None),
+        ("get_online_names", lambda: bot.get_online_names(), None),
+        ("watchlist_pass_cold", watchlist_pass, bot.watchlist_last_online_status.clear),
+        ("watchlist_pass_steady", watchlist_pass, None),
+        ("online_pages_cold", lambda: bot.get_online_pages(), reset_online_pages),
+        ("online_pages_cached", lambda: bot.get_online_pages(), None),
+        ("online_pages_filtered_cold", lambda: bot.get_online_pages("police|admin&premium"), reset_online_pages),
+    ]
+
+def forum_cases(bot, config):
+    """Cases that only depend on the guild and topic counts."""
+    settings = bot.load_config()
+    topic_id = next(iter(config.values()))["topic_id"]
+    replies = bot.load_forum_data(topic_id)
+    seen = {}
+
+    def forget_replies():
+        seen.clear()
+
+    def remember_replies():
+        if not seen:
+            for guild in settings.values():
+                if "topic_id" in guild:
+                    seen[guild["topic_id"]] = {int(reply["id"]) for reply in bot.load_forum_data(guild["topic_id"])}
+
+    guild_id, guild = next(iter(config.items()))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        embeds = [bot.render_reply_embed(reply) for reply in replies]
+    allowed = FakeInteraction(int(guild_id), guild["notification_channel_id"])
+    unconfigured = FakeInteraction(1, 1)
+
+    return [
+        ("replies_pass_new", lambda: bot.run_replies_pass(bot.load_config(), seen), forget_replies),
+        ("replies_pass_idle", lambda: bot.run_replies_pass(bot.load_config(), seen), remember_replies),
+        ("clean_html_page", lambda: [bot.clean_html(reply["content"]) for reply in replies], None),
+        ("render_reply_embeds", lambda: [bot.render_reply_embed(reply) for reply in replies], None),
+        ("send_reply_embeds", lambda: bot.send_reply_embeds(guild["notification_channel_id"], embeds), None),
+        ("check_guild_allowed", lambda: bot.check_guild(allowed), None),
+        ("check_guild_unconfigured", lambda: bot.check_guild(unconfigured), None),
+    ]
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+async def run(args):
+    client = FakeClient()
+    results = {}
+    bot = None
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='lsrp-bench-') as workspace:
+        for index, players in enumerate(args.players):
+            root = os.path.join(workspace, str(players))
+            config = synthetic.write_workspace(
+                root, players=players, guilds=args.guilds, topics=args.topics, topic_guilds=args.topic_guilds,
+                replies=args.replies, watchlist_size=args.watchlist, seed=args.seed
+            )
+            # bot.py resolves its files relative to the working directory
+            os.chdir(root)
+            try:
+                if bot is None:
+                    bot = import_bot(client)
+                bot.player_data_cache["version"] = None
+                bot.response_cache.clear()
+                bot.watchlist_last_online_status.clear()
+                cases = [(f"{name}[players={players}]", func, setup) for name, func, setup in size_cases(bot)]
+                if index == 0:
+                    cases += forum_cases(bot, config)
+                for key, func, setup in cases:
+                    if args.cases and not any(pattern in key for pattern in args.cases):
+                        continue
+                    # clean_html and the loaders print debug output, keep it out of the report
+                    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                        results[key] = await measure(func, args.iterations, client, setup)
+                    print(f"{key:<45} median {results[key]['median'] * 1000:9.2f} ms  "
+                          f"p95 {results[key]['p95'] * 1000:9.2f} ms  messages {results[key]['messages']}")
+            finally:
+                os.chdir(original_dir)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "results": results,
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time the bot's hot paths against synthetic data.")
+    parser.add_argument('--players', type=lambda value: [int(part) for part in value.split(',')], default=[500, 5000, 20000],
+                        help="Comma separated online player counts")
+    parser.add_argument('--guilds', type=int, default=2000)
+    parser.add_argument('--topics', type=int, default=50)
+    parser.add_argument('--topic-guilds', type=int, default=200, help="Guilds that follow a forum topic")
+    parser.add_argument('--replies', type=int, default=15, help="Replies per forum topic file")
+    parser.add_argument('--watchlist', type=int, default=25, help="Players per guild watchlist")
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cases', nargs='*', help="Only run cases whose name contains one of these")
+    parser.add_argument('--output', help="Write the JSON results here")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
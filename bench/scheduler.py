@@ -0,0 +1,89 @@
+import os
+import sys
+import random
+import argparse
+
+# Drive setup_db's SyncScheduler against a simulated upstream on a virtual clock and
+# check that snapshots are picked up soon after they are published:
+#   python -m bench.scheduler --period 120 --delay 3 --syncs 500
+# Exits with status 1 when staleness or fetches per sync exceed their limits.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from snapshot import format_sync_time
+from setup_db import SyncScheduler
+
+PAGE_WAIT = 5  # fetch_and_save_json_data sleeps this long after the page load
+WARMUP_SYNCS = 20  # Syncs the scheduler gets to learn the cadence before staleness counts
+SETTLE_SYNCS = SyncScheduler.LOWER_BOUND_SYNCS + 10  # Syncs allowed to relearn a changed publish delay
+START = 1_700_000_000
+
+def simulate(period, delays, syncs, latency, jitter, seed=0):
+    """Run the fetch loop until `syncs` syncs were published; returns ([(sync, staleness)], fetches per sync).
+
+    `delays` maps a sync number to the publish delay from then on, so delay changes can be simulated.
+    """
+    rng = random.Random(seed)
+    scheduler = SyncScheduler()
+    delay = delays[0]
+    now = START + rng.uniform(0, period)
+    fetched_at = None  # setup_db's first page comes from the login
+    seen = set()
+    staleness = []
+    fetches = 0
+    while True:
+        sync_number = int((now - START) // period)
+        delay = delays.get(sync_number, delay)
+        if sync_number >= syncs:
+            break
+        # Upstream answers with the newest sync published when the request arrives
+        arrival = now + latency
+        latest = (arrival - START - delay) // period
+        sync_ts = START + latest * period
+        fetches += 1
+        if latest not in seen:
+            seen.add(latest)
+            staleness.append((latest, arrival - (sync_ts + delay)))
+        scheduler.observe(format_sync_time(sync_ts), fetched_at)
+
+        now = arrival + PAGE_WAIT
+        now += scheduler.next_delay(now=now) + rng.uniform(0, jitter)
+        fetched_at = now
+    return staleness, fetches / max(1, syncs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate SyncScheduler against a fixed-cadence upstream.")
+    parser.add_argument('--period', type=float, default=120, help="Seconds between upstream syncs")
+    parser.add_argument('--delay', type=float, nargs='+', default=[3, 45, -20],
+                        help="Publish delays (syncTime to availability, including clock skew) to simulate")
+    parser.add_argument('--syncs', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=1.0, help="Seconds until upstream sees a request")
+    parser.add_argument('--jitter', type=float, default=1.0, help="Maximum oversleep per fetch")
+    parser.add_argument('--max-staleness', type=float, default=15, help="Allowed seconds between publish and fetch")
+    parser.add_argument('--max-fetches', type=float, default=2.0, help="Allowed average fetches per sync")
+    args = parser.parse_args(argv)
+
+    scenarios = [(f"delay {delay:+.0f}s", {0: delay}) for delay in args.delay]
+    if len(args.delay) > 1:
+        # The delay moves while running, e.g. upstream slows down and recovers
+        changes = {0: args.delay[0]}
+        for index, delay in enumerate(args.delay[1:], 1):
+            changes[index * args.syncs // len(args.delay)] = delay
+        scenarios.append(("delay changes " + " -> ".join(f"{delay:+.0f}s" for delay in args.delay), changes))
+
+    failed = False
+    for name, delays in scenarios:
+        samples, fetches = simulate(args.period, delays, args.syncs, args.latency, args.jitter)
+        ordered = sorted(value for sync, value in samples if sync >= WARMUP_SYNCS)
+        # A changed delay takes some syncs to relearn, during which staleness may reach one period
+        steady = [value for sync, value in samples
+                  if sync >= WARMUP_SYNCS and not any(0 <= sync - change < SETTLE_SYNCS for change in delays if change)]
+        ok = (max(steady) <= args.max_staleness and ordered[-1] <= args.period + args.max_staleness
+              and fetches <= args.max_fetches)
+        failed |= not ok
+        print(f"{name:<40} staleness mean {sum(ordered) / len(ordered):6.1f}s  steady max {max(steady):6.1f}s  "
+              f"max {ordered[-1]:6.1f}s  fetches/sync {fetches:4.2f}  {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
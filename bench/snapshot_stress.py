@@ -0,0 +1,72 @@
+import os
+import sys
+import argparse
+import tempfile
+import threading
+
+# Hammer the binary snapshot with in-place rewrites while reader threads query it,
+# checking that every read matches one of the published player lists:
+#   python -m bench.snapshot_stress --players 5000 --writes 200 --readers 2
+# Exits with status 1 on a torn read (an exception or a result matching neither list).
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from bench import synthetic
+from snapshot import FLAGS, FlagIndex, SnapshotReader, write_snapshot
+
+def fingerprint(index):
+    return (tuple(index.names), tuple(index.accounts), tuple(index.count(flag) for flag in FLAGS))
+
+def run(players, writes, readers, seed=0):
+    """Returns (reads, failures) where failures are descriptions of bad reads."""
+    # Same sizes, different people and flags, so every write happens in place under the seqlock
+    lists = [synthetic.make_player_list(players, seed + offset) for offset in (0, 1)]
+    expected = {fingerprint(FlagIndex.from_player_data(player_list)) for player_list in lists}
+    failures = []
+    reads = [0] * readers
+    done = threading.Event()
+
+    with tempfile.TemporaryDirectory(prefix='lsrp-snapshot-') as workspace:
+        path = os.path.join(workspace, 'player_list.bin')
+        write_snapshot(path, lists[0])
+
+        def read(number):
+            reader = SnapshotReader(path)
+            try:
+                while not done.is_set():
+                    try:
+                        result = fingerprint(reader.flag_index())
+                    except Exception as e:
+                        failures.append(f"reader {number}: {type(e).__name__}: {e}")
+                        continue
+                    if result not in expected:
+                        failures.append(f"reader {number}: result matches neither published list")
+                    reads[number] += 1
+            finally:
+                reader.close()
+
+        threads = [threading.Thread(target=read, args=(number,), daemon=True) for number in range(readers)]
+        for thread in threads:
+            thread.start()
+        for write in range(writes):
+            write_snapshot(path, lists[write % 2])
+        done.set()
+        for thread in threads:
+            thread.join()
+    return sum(reads), failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check SnapshotReader against a concurrent in-place writer.")
+    parser.add_argument('--players', type=int, default=5000)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--readers', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    reads, failures = run(args.players, args.writes, args.readers)
+    for failure in failures[:10]:
+        print(failure)
+    print(f"{reads} consistent reads, {len(failures)} torn reads over {args.writes} writes")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import os
+import sys
+import math
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+# Local stand-in for the LS-RP forum API and the UCP player list, with injectable
+# rate limits, latency, errors and page rollovers:
+#   python -m bench.standin --port 8080 --rate-limit 60 --error-rate 0.02 --latency 0.2
+#   FORUM_API_BASE=http://127.0.0.1:8080 python forum_monitor.py
+#   UCP_BASE_URL=http://127.0.0.1:8080 python setup_db.py
+# GET /_stats returns the request, 429 and error counters as JSON.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from bench import synthetic
+
+SESSION_COOKIE = 'ucp_session'
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><body>
+<form method="post" action="/login">
+  <input formcontrolname="name" name="name">
+  <input formcontrolname="password" name="password" type="password">
+  <button type="submit">Login</button>
+</form>
+</body></html>"""
+
+def poisson(rng, mean):
+    """Number of arrivals in an interval with the given mean (Knuth's method, means are small here)."""
+    limit = math.exp(-mean)
+    count, product = 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+class ForumTopic:
+    """Replies of one topic; new ones arrive over time and roll onto new pages."""
+
+    def __init__(self, topic_id, initial_replies, seed):
+        self.topic_id = topic_id
+        self.seed = seed
+        self.replies = synthetic.make_forum_replies(topic_id, initial_replies, seed=seed)
+        self.next_id = (self.replies[-1]["id"] + 1) if self.replies else 100000
+
+    def post(self, count):
+        new = synthetic.make_forum_replies(self.topic_id, count, first_id=self.next_id, seed=self.seed + self.next_id)
+        self.replies.extend(new)
+        self.next_id += count
+
+class StandinState:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.topics = {}
+        self.started = time.monotonic()
+        self.last_reply_tick = self.started
+        self.pool = synthetic.make_players(args.players * 2, args.seed)
+        self.online = set(range(args.players))
+        self.sync_time = datetime.now(timezone.utc)
+        self.last_sync = self.started
+        self.buckets = {}  # Client address -> (tokens, last refill) for --rate-limit
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "timeouts": 0, "replies_posted": 0, "syncs": 0}
+
+    def topic(self, topic_id):
+        if topic_id not in self.topics:
+            self.topics[topic_id] = ForumTopic(topic_id, self.args.initial_replies, self.args.seed)
+        return self.topics[topic_id]
+
+    def advance(self):
+        """Post replies and rotate players for the time elapsed since the last request."""
+        now = time.monotonic()
+        elapsed_minutes = (now - self.last_reply_tick) / 60
+        if elapsed_minutes > 0 and self.args.reply_rate:
+            for topic in self.topics.values():
+                count = poisson(self.rng, elapsed_minutes * self.args.reply_rate)
+                # Bursts push a topic over several pages between two polls
+                if self.args.burst and self.rng.random() < self.args.burst_chance * elapsed_minutes:
+                    count += self.args.burst
+                if count:
+                    topic.post(count)
+                    self.stats["replies_posted"] += count
+        self.last_reply_tick = now
+
+        while now - self.last_sync >= self.args.sync_period:
+            self.last_sync += self.args.sync_period
+            leaving = self.rng.sample(sorted(self.online), int(len(self.online) * self.args.churn))
+            joining = self.rng.sample(sorted(set(range(len(self.pool))) - self.online), len(leaving))
+            self.online = (self.online - set(leaving)) | set(joining)
+            self.sync_time = datetime.now(timezone.utc)
+            self.stats["syncs"] += 1
+
+    def rate_limited(self, client):
+        """Token bucket per client; returns seconds to wait when the bucket is empty."""
+        limit = self.args.rate_limit
+        if not limit:
+            return None
+        now = time.monotonic()
+        tokens, last = self.buckets.get(client, (limit, now))
+        tokens = min(limit, tokens + (now - last) * limit / 60)
+        if tokens < 1:
+            self.buckets[client] = (tokens, now)
+            return math.ceil((1 - tokens) * 60 / limit)
+        self.buckets[client] = (tokens - 1, now)
+        return None
+
+@web.middleware
+async def fault_injection(request, handler):
+    """Apply latency, rate limits, errors and hangs before the real handler runs."""
+    state = request.app['state']
+    args = state.args
+    if request.path.startswith('/_'):
+        return await handler(request)
+    state.stats["requests"] += 1
+    if args.latency:
+        await asyncio.sleep(max(0.0, state.rng.gauss(args.latency, args.latency / 4)))
+
+    retry_after = state.rate_limited(request.remote)
+    if retry_after is None and state.rng.random() < args.rate_limit_chance:
+        retry_after = args.retry_after
+    if retry_after is not None:
+        state.stats["rate_limited"] += 1
+        return web.json_response({"errorCode": "429", "errorMessage": "TOO_MANY_REQUESTS"},
+                                 status=429, headers={"Retry-After": str(retry_after)})
+    if state.rng.random() < args.timeout_chance:
+        state.stats["timeouts"] += 1
+        await asyncio.sleep(args.timeout_seconds)
+    if state.rng.random() < args.error_rate:
+        state.stats["errors"] += 1
+        return web.Response(status=state.rng.choice((500, 502, 503)), text="Service Unavailable")
+    state.advance()
+    return await handler(request)
+
+async def topic_posts(request):
+    state = request.app['state']
+    topic = state.topic(request.match_info['topic_id'])
+    per_page = int(request.query.get('perPage', 25))
+    page = int(request.query.get('page', 1))
+    total_pages = max(1, math.ceil(len(topic.replies) / per_page))
+    results = topic.replies[(page - 1) * per_page:page * per_page] if page >= 1 else []
+    return web.json_response({
+        "page": page,
+        "perPage": per_page,
+        "totalResults": len(topic.replies),
+        "totalPages": total_pages,
+        "results": results,
+    })
+
+async def player_list(request):
+    state = request.app['state']
+    if state.args.require_login and request.cookies.get(SESSION_COOKIE) != 'valid':
+        return web.Response(status=403, text="403 Forbidden")
+    sync_time = state.sync_time
+    return web.json_response({
+        "syncTime": sync_time.strftime('%Y-%m-%dT%H:%M:%S.') + f"{sync_time.microsecond // 1000:03d}Z",
+        "players": [state.pool[index] for index in sorted(state.online)],
+    })
+
+async def login_page(request):
+    return web.Response(text=LOGIN_PAGE, content_type='text/html')
+
+async def login(request):
+    response = web.HTTPFound('/')
+    response.set_cookie(SESSION_COOKIE, 'valid')
+    raise response
+
+async def stats(request):
+    state = request.app['state']
+    return web.json_response(dict(state.stats, topics={topic_id: len(topic.replies) for topic_id, topic in state.topics.items()},
+                                  players_online=len(state.online)))
+
+def build_app(args):
+    app = web.Application(middlewares=[fault_injection])
+    app['state'] = StandinState(args)
+    app.router.add_get('/api/forums/topics/{topic_id}/posts', topic_posts)
+    app.router.add_get('/api/sa/player-list', player_list)
+    app.router.add_get('/', login_page)
+    app.router.add_post('/login', login)
+    app.router.add_get('/_stats', stats)
+    return app
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a stand-in forum API and UCP player list.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--initial-replies', type=int, default=40, help="Replies per topic when first requested")
+    parser.add_argument('--reply-rate', type=float, default=0.5, help="New replies per topic per minute")
+    parser.add_argument('--burst', type=int, default=0, help="Replies posted at once in a burst, forcing page rollovers")
+    parser.add_argument('--burst-chance', type=float, default=0.05, help="Bursts per topic per minute")
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--sync-period', type=float, default=120, help="Seconds between player list syncs")
+    parser.add_argument('--churn', type=float, default=0.05, help="Fraction of players replaced on each sync")
+    parser.add_argument('--require-login', action='store_true', help="Answer 403 to the player list without a session cookie")
+    parser.add_argument('--latency', type=float, default=0.0, help="Mean seconds added to every response")
+    parser.add_argument('--rate-limit', type=float, default=0, help="Requests per minute per client before 429s")
+    parser.add_argument('--rate-limit-chance', type=float, default=0.0, help="Probability of a random 429")
+    parser.add_argument('--retry-after', type=int, default=30, help="Retry-After seconds on random 429s")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability of a 5xx response")
+    parser.add_argument('--timeout-chance', type=float, default=0.0, help="Probability of hanging before answering")
+    parser.add_argument('--timeout-seconds', type=float, default=35, help="How long a hung request takes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    web.run_app(build_app(args), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from snapshot import FLAGS
+
+FIRST_SYLLABLES = ("Ja", "Mi", "Ro", "Ca", "Tu", "Le", "Da", "Vi", "Ni", "Sa", "Fe", "Ga", "Ho", "Ke", "Ma", "Pa")
+LAST_SYLLABLES = ("ggs", "rez", "ton", "wang", "son", "lli", "vic", "ers", "ford", "ley", "nez", "ski", "man", "ros")
+FLAG_RATES = {"isAdmin": 0.02, "isTester": 0.03, "isDeveloper": 0.005, "isPremium": 0.2,
+              "hideAccountName": 0.1, "isPolice": 0.08, "isMedic": 0.05}
+
+def make_name(rng):
+    first = "".join(rng.choice(FIRST_SYLLABLES) for _ in range(rng.randint(1, 2)))
+    last = rng.choice(FIRST_SYLLABLES) + rng.choice(LAST_SYLLABLES)
+    return first.capitalize(), last.capitalize()
+
+def make_players(count, seed=0):
+    """Unique players shaped like the UCP player-list entries."""
+    rng = random.Random(seed)
+    players = []
+    seen = set()
+    while len(players) < count:
+        first, last = make_name(rng)
+        character_name = f"{first}_{last}"
+        if character_name in seen:
+            character_name = f"{first}_{last}{len(seen)}"  # Keep names unique at any size
+        seen.add(character_name)
+        player = {"accountName": f"{first}{last[:3]}{rng.randint(1, 999)}", "characterName": character_name}
+        for flag in FLAGS:
+            player[flag] = rng.random() < FLAG_RATES.get(flag, 0.0)
+        players.append(player)
+    return players
+
+def make_player_list(count, seed=0, sync_time=None):
+    sync_time = sync_time or datetime.now(timezone.utc)
+    return {"syncTime": sync_time.strftime('%Y-%m-%dT%H:%M:%S.') + f"{sync_time.microsecond // 1000:03d}Z",
+            "players": make_players(count, seed)}
+
+def make_reply_content(rng, reply_id):
+    paragraphs = [f"<p>Reply {reply_id}: " + " ".join(rng.choice(("lorem", "ipsum", "dolor", "sit", "amet", "roleplay", "server")) for _ in range(rng.randint(20, 120))) + "</p>"
+                  for _ in range(rng.randint(1, 6))]
+    if rng.random() < 0.3:
+        paragraphs.insert(0, f"<blockquote class=\"ipsQuote\"><div class=\"ipsQuote_contents\"><p>{'quoted ' * rng.randint(5, 40)}</p></div></blockquote>")
+    if rng.random() < 0.25:
+        paragraphs.append(f"<p><img src=\"https://community.ls-rp.com/uploads/{reply_id}.png\" alt=\"image\"></p>")
+    if rng.random() < 0.1:
+        paragraphs.append("<p><iframe src=\"https://www.youtube.com/embed/dQw4w9WgXcQ\"></iframe></p>")
+    return "\n".join(paragraphs)
+
+def make_forum_replies(topic_id, count, first_id=100000, seed=0):
+    """One page of forum API results for a topic, ordered by reply id."""
+    rng = random.Random(f"{seed}:{topic_id}")
+    start = datetime(2024, 10, 25, 12, 0, tzinfo=timezone.utc)
+    replies = []
+    for index in range(count):
+        reply_id = first_id + index
+        author = "".join(rng.choice(FIRST_SYLLABLES) for _ in range(3))
+        replies.append({
+            "id": reply_id,
+            "item_id": int(topic_id),
+            "author": {"id": rng.randint(1, 50000), "name": author,
+                       "formattedName": f"<span style=\"color:#{rng.randint(0, 0xFFFFFF):06x}\">{author}</span>"},
+            "date": (start + timedelta(minutes=7 * index)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "content": make_reply_content(rng, reply_id),
+            "url": f"https://community.ls-rp.com/topic/{topic_id}-synthetic/?do=findComment&comment={reply_id}",
+        })
+    return replies
+
+def make_config(guilds, topics, topic_guilds=None):
+    """bot_config.json with `guilds` configured servers, the first `topic_guilds` following one of `topics` topics."""
+    topic_guilds = guilds if topic_guilds is None else topic_guilds
+    config = {}
+    for index in range(guilds):
+        guild = {"notification_channel_id": 800000000000000000 + index, "guild_name": f"Guild {index}"}
+        if index < topic_guilds:
+            guild["topic_id"] = str(10000 + index % topics)
+        config[str(900000000000000000 + index)] = guild
+    return config
+
+def make_watchlists(config, players, size, online_fraction=0.5, seed=0):
+    """Watchlists per guild, `online_fraction` of each drawn from the online players."""
+    rng = random.Random(seed)
+    online = [player["characterName"] for player in players]
+    watchlists = {}
+    for guild_id in config:
+        watched_online = rng.sample(online, min(len(online), int(size * online_fraction)))
+        offline = [f"Offline_Player{rng.randint(0, 100000)}" for _ in range(size - len(watched_online))]
+        watchlists[guild_id] = watched_online + offline
+    return watchlists
+
+def write_workspace(root, players=1000, guilds=1000, topics=50, topic_guilds=None, replies=15, watchlist_size=25, blocked=0, seed=0):
+    """Write a complete bot working directory (bot_config.json and data/) under `root`."""
+    data_dir = os.path.join(root, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    player_list = make_player_list(players, seed)
+    config = make_config(guilds, topics, topic_guilds)
+    files = {
+        os.path.join(root, 'bot_config.json'): config,
+        os.path.join(data_dir, 'player_list.json'): player_list,
+        os.path.join(data_dir, 'watchlists.json'): make_watchlists(config, player_list["players"], watchlist_size, seed=seed),
+        os.path.join(data_dir, 'blocked_guilds.json'): [int(guild_id) for guild_id in list(config)[:blocked]],
+    }
+    for topic in range(topics):
+        topic_id = str(10000 + topic)
+        files[os.path.join(data_dir, f'forum_{topic_id}.json')] = make_forum_replies(topic_id, replies, seed=seed)
+    for path, content in files.items():
+        with open(path, 'w') as f:
+            json.dump(content, f)
+    return config
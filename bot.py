@@ -1,23 +1,31 @@
+import startup_profile
+startup_profile.install()
 import discord
 import json
 from discord.ext import commands
 import os
 import asyncio
-import subprocess
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-from forum_monitor import fetch_total_pages, fetch_forum_replies, save_replies_to_file
+from datetime import datetime, timedelta, timezone
+from snapshot import SnapshotReader, FlagIndex, visible_account
+from supervisor import ProcessSupervisor
+from loop_monitor import LoopLagMonitor
+from perf import CommandStats
+from response_cache import ResponseCache
+from account_index import AccountIndex
+from population import PopulationHistory, sparkline
+import profiling
+import metrics
 from discord.ui import Button, View
 from discord import app_commands
-from collections import defaultdict
-import requests
+from collections import defaultdict, deque
 import logging
 import sys
 import aiohttp
-import threading
-import queue
 import time
+import hashlib
+import threading
+import re
 
 
 
@@ -30,43 +38,149 @@ FORUMS = 749      # Forums parameter (fixed)
 PER_PAGE = 15     # Number of replies per page (fixed)
 CONFIG_FILE = 'bot_config.json'
 DATA_DIR = 'data'
+# 'minimal' only subscribes to what slash commands need, 'legacy' restores the old message intents
+BOT_INTENTS_PROFILE = os.getenv('BOT_INTENTS_PROFILE', 'minimal')
+RESOURCE_REPORT_INTERVAL = 3600  # Seconds between memory/CPU log lines for comparing profiles
+COMMAND_TREE_HASH_FILE = os.path.join(DATA_DIR, 'command_tree.hash')  # Hash of the last synced command tree
+USE_BINARY_SNAPSHOT = os.getenv('BINARY_SNAPSHOT', '0') == '1'  # Read data/player_list.bin via mmap
+MAX_EMBEDS_PER_MESSAGE = 10  # Discord limits per message
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+ONLINE_PAGE_CHARS = 4096  # Embed description limit per /online page
+# /online filter and /staff names for the snapshot flags
+FILTER_FLAGS = {"admin": "isAdmin", "tester": "isTester", "developer": "isDeveloper",
+                "premium": "isPremium", "police": "isPolice", "medic": "isMedic"}
+POPULATION_FILE = os.path.join(DATA_DIR, 'population.bin')  # Written by setup_db.py
+POPULATION_RANGES = {"24h": 86400, "7d": 7 * 86400, "30d": 30 * 86400, "1y": 365 * 86400}
+SPARKLINE_WIDTH = 48  # Characters per /population chart, fits a mobile embed
+STATUS_BOARD_INTERVAL = 30  # Seconds between checks for boards that need an edit
+STATUS_BOARD_MIN_EDIT_INTERVAL = 60  # Minimum seconds between edits of one board message
+STATUS_BOARD_EDIT_SPACING = 1  # Seconds between edits of different boards, keeps bursts off the rate limits
+
+LOG_QUEUE_SIZE = 1000  # Records buffered for the webhook before the oldest are dropped
+LOG_BATCH_CHARS = 1990  # Room for the code block fences within Discord's 2000 char limit
+LOG_FLUSH_INTERVAL = 5  # Seconds a partial batch waits for more records
+LOG_SHUTDOWN_TIMEOUT = 5  # Seconds spent flushing remaining records on shutdown
 
 # Configure logging
 class DiscordWebhookHandler(logging.Handler):
-    def __init__(self, webhook_url, log_queue):
+    """Hand formatted records to the webhook worker through a bounded, drop-oldest queue."""
+
+    def __init__(self, webhook_url, max_queue_size=LOG_QUEUE_SIZE):
         super().__init__()
         self.webhook_url = webhook_url
-        self.log_queue = log_queue
+        self.max_queue_size = max_queue_size
+        self.loop = None
+        self.queue = None
+        self.pending = deque()  # Records emitted before the worker attached
+        self.dropped = 0
+
+    def attach(self, loop):
+        """Bind the handler to the worker's event loop and move over early records."""
+        if self.loop is loop and self.queue is not None:
+            return
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        while self.pending:
+            self._enqueue(self.pending.popleft())
+
+    def _enqueue(self, msg):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(msg)
 
     def emit(self, record):
         try:
             msg = self.format(record)
-            self.log_queue.put(msg)
+            if self.queue is None:
+                if len(self.pending) >= self.max_queue_size:
+                    self.pending.popleft()
+                    self.dropped += 1
+                self.pending.append(msg)
+            else:
+                # Records may come from executor threads, the queue lives on the loop
+                self.loop.call_soon_threadsafe(self._enqueue, msg)
+        except RuntimeError:
+            pass  # Event loop already closed during shutdown
         except Exception:
             self.handleError(record)
 
-async def discord_log_worker(webhook_url, log_queue):
-    session = aiohttp.ClientSession()
-    while True:
-        msg = await asyncio.get_event_loop().run_in_executor(None, log_queue.get)
+def batch_log_messages(records):
+    """Pack log records into webhook-sized messages, splitting only oversized records."""
+    messages = []
+    current = ""
+    for record in records:
+        pieces = [record[i:i + LOG_BATCH_CHARS] for i in range(0, len(record), LOG_BATCH_CHARS)] or [""]
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > LOG_BATCH_CHARS:
+                messages.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        messages.append(current)
+    return messages
+
+async def post_to_webhook(session, webhook_url, content):
+    """POST one message, honouring 429 retry_after and the webhook rate limit headers."""
+    for _ in range(5):
+        async with session.post(webhook_url, json={"content": f"```{content}```"}) as response:
+            if response.status == 429:
+                data = await response.json(content_type=None)
+                retry_after = float(data.get("retry_after") or response.headers.get("Retry-After", 1))
+                await asyncio.sleep(retry_after)
+                continue
+            if response.status >= 400:
+                print(f"Error sending log to Discord webhook: HTTP {response.status}")
+                return
+            # Wait out the bucket before the next POST instead of running into a 429
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                await asyncio.sleep(float(response.headers.get("X-RateLimit-Reset-After", 1)))
+            return
+    print("Giving up on a log message after repeated webhook rate limits")
+
+async def ship_log_batch(session, handler, records):
+    if handler.dropped:
+        records.insert(0, f"[{handler.dropped} log records dropped, queue full]")
+        handler.dropped = 0
+    for message in batch_log_messages(records):
         try:
-            # Split message if it's too long
-            if len(msg) > 2000:
-                chunks = [msg[i:i+1990] for i in range(0, len(msg), 1990)]
-                for chunk in chunks:
-                    await session.post(
-                        webhook_url,
-                        json={"content": f"```{chunk}```"}
-                    )
-            else:
-                await session.post(
-                    webhook_url,
-                    json={"content": f"```{msg}```"}
-                )
-        except Exception as e:
+            await post_to_webhook(session, handler.webhook_url, message)
+            MESSAGES_SENT.inc(route="log_webhook")
+        except aiohttp.ClientError as e:
             print(f"Error sending log to Discord webhook: {e}")
-        finally:
-            log_queue.task_done()
+
+async def discord_log_worker(handler):
+    """Batch log records into ~2000 char webhook messages, flushed every LOG_FLUSH_INTERVAL."""
+    loop = asyncio.get_running_loop()
+    handler.attach(loop)
+    async with aiohttp.ClientSession() as session:
+        try:
+            while True:
+                records = [await handler.queue.get()]
+                size = len(records[0])
+                deadline = loop.time() + LOG_FLUSH_INTERVAL
+                while size < LOG_BATCH_CHARS:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        record = await asyncio.wait_for(handler.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    records.append(record)
+                    size += len(record) + 1
+                await ship_log_batch(session, handler, records)
+        except asyncio.CancelledError:
+            # Flush whatever is left before the session closes
+            remaining = []
+            while not handler.queue.empty():
+                remaining.append(handler.queue.get_nowait())
+            if remaining or handler.dropped:
+                try:
+                    await asyncio.wait_for(ship_log_batch(session, handler, remaining), LOG_SHUTDOWN_TIMEOUT)
+                except (asyncio.TimeoutError, aiohttp.ClientError):
+                    pass
+            raise
 
 # Setup logging configuration
 def setup_logging():
@@ -79,13 +193,14 @@ def setup_logging():
     logger.addHandler(console_handler)
     
     # Discord webhook handler
-    log_queue = queue.Queue()
     if LOG_WEBHOOK_URL:
-        discord_handler = DiscordWebhookHandler(LOG_WEBHOOK_URL, log_queue)
+        discord_handler = DiscordWebhookHandler(LOG_WEBHOOK_URL)
         discord_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        # Scraper output is only shipped to Discord when it is a warning or worse
+        discord_handler.addFilter(lambda record: not record.name.startswith('scraper.') or record.levelno >= logging.WARNING)
         logger.addHandler(discord_handler)
-        # Start the async log worker after the event loop is running (see on_ready)
-        logger.discord_log_queue = log_queue
+        # The async log worker is started from setup_hook once the event loop is running
+        logger.discord_log_handler = discord_handler
     else:
         print("Warning: LOG_WEBHOOK_URL not set in .env file. Discord logging disabled.")
     
@@ -94,33 +209,214 @@ def setup_logging():
 # Initialize logger
 logger = setup_logging()
 
+# Per-command latency histograms, fed by TimedCommandTree and the timed loaders below
+command_stats = CommandStats()
+
+MESSAGES_SENT = metrics.counter('lsrp_discord_messages_sent_total', 'Messages sent to Discord by route')
+CACHE_REQUESTS = metrics.counter('lsrp_cache_requests_total', 'Cache lookups by cache and result')
 
+def log_queue_depth():
+    handler = getattr(logger, 'discord_log_handler', None)
+    if handler is None:
+        return None
+    return handler.queue.qsize() if handler.queue is not None else len(handler.pending)
+
+metrics.gauge('lsrp_log_queue_depth', 'Log records waiting for the webhook worker', function=log_queue_depth)
+metrics.gauge(
+    'lsrp_log_records_dropped', 'Log records dropped since the last shipped batch',
+    function=lambda: getattr(getattr(logger, 'discord_log_handler', None), 'dropped', None)
+)
 
-intents = discord.Intents.default()
-intents.messages = True  
-intents.message_content = True
-intents.guilds = True  # Enable guilds intent
+
+
+def build_client_options(profile):
+    """Gateway intents and cache settings for the configured profile."""
+    if profile == 'legacy':
+        intents = discord.Intents.default()
+        intents.messages = True
+        intents.message_content = True
+        intents.guilds = True  # Enable guilds intent
+        return {"intents": intents}
+
+    # Slash commands arrive as interactions, so no message events or caches are needed
+    intents = discord.Intents.none()
+    intents.guilds = True  # Guild and channel cache for check_guild and notifications
+    return {
+        "intents": intents,
+        "max_messages": None,  # Disable the message cache
+        "chunk_guilds_at_startup": False,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+    }
+
+def process_usage():
+    """Return (resident memory in MB, CPU seconds) of the bot process."""
+    cpu_seconds = time.process_time()
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), cpu_seconds
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, cpu_seconds
+
+async def log_resource_usage():
+    """Periodically log memory and CPU so intent profiles can be compared at our guild count."""
+    while True:
+        await bot.gateway_connected.wait()
+        rss_mb, cpu_seconds = process_usage()
+        logger.info(
+            f"Resource usage [{BOT_INTENTS_PROFILE} profile]: {len(bot.guilds)} guilds, "
+            f"rss={rss_mb:.1f} MB, cpu={cpu_seconds:.1f}s, cached messages={len(bot.cached_messages)}"
+        )
+        await asyncio.sleep(RESOURCE_REPORT_INTERVAL)
+
+class BackgroundTaskRegistry:
+    """Start each background loop exactly once and restart it if it crashes."""
+
+    MIN_RESTART_DELAY = 5
+    MAX_RESTART_DELAY = 300
+    STABLE_UPTIME = 300  # A run this long resets the restart delay
+
+    def __init__(self):
+        self.tasks = {}
+        self.restarts = defaultdict(int)
+
+    def start(self, name, coroutine_factory):
+        if name in self.tasks and not self.tasks[name].done():
+            return  # Already running
+        self.tasks[name] = asyncio.create_task(self._supervise(name, coroutine_factory), name=name)
+
+    async def _supervise(self, name, coroutine_factory):
+        delay = self.MIN_RESTART_DELAY
+        while True:
+            started_at = time.monotonic()
+            try:
+                await coroutine_factory()
+                logger.warning(f"Background task {name} returned unexpectedly")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Background task {name} crashed: {e}")
+            if time.monotonic() - started_at >= self.STABLE_UPTIME:
+                delay = self.MIN_RESTART_DELAY
+            self.restarts[name] += 1
+            logger.info(f"Restarting background task {name} in {delay}s (restarts: {self.restarts[name]})")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.MAX_RESTART_DELAY)
+
+    async def stop(self):
+        # Reverse start order, so the log worker started first ships everything else's last logs
+        for name in reversed(list(self.tasks)):
+            task = self.tasks.pop(name)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def status(self):
+        return {name: (not task.done(), self.restarts[name]) for name, task in self.tasks.items()}
+
+background_tasks = BackgroundTaskRegistry()
+loop_lag_monitor = LoopLagMonitor()
+
+def loop_lag_metrics():
+    """Expose the lag monitor's own buckets as a Prometheus histogram."""
+    lines = ["# HELP lsrp_loop_lag_seconds Event loop lag per heartbeat", "# TYPE lsrp_loop_lag_seconds histogram"]
+    cumulative = 0
+    for bound, count in loop_lag_monitor.histogram():
+        cumulative += count
+        lines.append(f'lsrp_loop_lag_seconds_bucket{{le="{metrics.format_value(bound)}"}} {cumulative}')
+    lines.append(f"lsrp_loop_lag_seconds_sum {loop_lag_monitor.total_lag}")
+    lines.append(f"lsrp_loop_lag_seconds_count {loop_lag_monitor.samples}")
+    return "\n".join(lines)
+
+metrics.REGISTRY.add_collector(loop_lag_metrics)
+
+class TimedCommandTree(app_commands.CommandTree):
+    """Command tree that times every app command from receipt to completion."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        command_stats.begin(interaction)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        original = getattr(error, "original", error)
+        if isinstance(original, discord.NotFound) and original.code == 10062:  # Unknown interaction
+            command_stats.record_expired(interaction)
+        command_stats.finish(interaction, error=not isinstance(error, app_commands.CheckFailure))
+        await super().on_error(interaction, error)
 
 class CustomBot(commands.Bot):
     async def setup_hook(self) -> None:
+        startup_profile.report_imports()
+        metrics.start_http_server('METRICS_PORT_BOT')
         self.owner_id = BOT_OWNER_ID
+        # Pager buttons on /online messages keep working after a restart; views need the running loop
+        self.online_pager = OnlinePager()
+        self.add_view(self.online_pager)
+        # Set while the gateway session is up; only Discord-facing dispatch waits on it
+        self.gateway_connected = asyncio.Event()
+
+        # setup_hook runs once per process, unlike on_ready which fires on every reconnect
+        if LOG_WEBHOOK_URL and hasattr(logger, 'discord_log_handler'):
+            background_tasks.start("discord_log_worker", lambda: discord_log_worker(logger.discord_log_handler))
+        scraper_supervisor.start()
+        background_tasks.start("monitor_replies", monitor_replies)  # Reads JSON files updated by forum_monitor.py
+        background_tasks.start("check_watchlists", check_watchlists)
+        background_tasks.start("update_status_boards", update_status_boards)
+        background_tasks.start("log_resource_usage", log_resource_usage)
+        background_tasks.start("loop_lag_monitor", loop_lag_monitor.run)
+        # background_tasks.start("they_gotta_go", they_gotta_go)  # DISABLED - using watchlist instead
+
+        await sync_command_tree()
+
+    async def close(self) -> None:
+        # The scrapers live as long as the bot process, not the gateway session
+        await cleanup_processes()
+        await background_tasks.stop()
+        account_index.save_if_needed(force=True)
+        await super().close()
+
+bot = CustomBot(command_prefix='!', tree_cls=TimedCommandTree, **build_client_options(BOT_INTENTS_PROFILE))
+
+def command_tree_hash():
+    """Hash the command payloads Discord would receive from a sync."""
+    payload = []
+    for command in bot.tree.get_commands():
+        try:
+            payload.append(command.to_dict(bot.tree))
+        except TypeError:  # discord.py < 2.4 takes no tree argument
+            payload.append(command.to_dict())
+    payload.sort(key=lambda command: command.get("name", ""))
+    encoded = json.dumps([bot.application_id, payload], sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+async def sync_command_tree():
+    """Sync the global command tree only when it changed since the last successful sync."""
+    try:
+        tree_hash = command_tree_hash()
+        try:
+            with open(COMMAND_TREE_HASH_FILE, 'r') as f:
+                synced_hash = f.read().strip()
+        except FileNotFoundError:
+            synced_hash = None
+
+        if tree_hash == synced_hash:
+            logger.info("Command tree unchanged since last sync, skipping sync")
+            return
 
-bot = CustomBot(command_prefix='!', intents=intents)
+        logger.info("Starting command tree sync...")
+        synced = await bot.tree.sync()
+        logger.info(f"Synced {len(synced)} commands globally")
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(COMMAND_TREE_HASH_FILE, 'w') as f:
+            f.write(tree_hash)
+    except Exception as e:
+        logger.error(f"Failed to sync commands: {e}")
 
 @bot.event
 async def on_ready():
+    bot.gateway_connected.set()
+    startup_profile.mark("gateway_ready")
     try:
-        # Force sync commands
-        logger.info("Starting command tree sync...")
-        synced = await bot.tree.sync()
-        logger.info(f"Synced {len(synced)} commands globally")
-        
-        # Start Discord log worker if needed
-        if LOG_WEBHOOK_URL and hasattr(logger, 'discord_log_queue'):
-            if not hasattr(bot, '_discord_log_worker_started'):
-                bot.loop.create_task(discord_log_worker(LOG_WEBHOOK_URL, logger.discord_log_queue))
-                bot._discord_log_worker_started = True
-        
         # Log number of configured guilds
         settings = load_config()
         guild_count = len(settings)
@@ -131,8 +427,6 @@ async def on_ready():
         
         # Get all guilds the bot is actually in
         bot_guilds = {str(g.id): g.name for g in bot.guilds}
-        
-
 
         # Log each configured guild with its status
         for guild_id, config in settings.items():
@@ -141,20 +435,8 @@ async def on_ready():
                 logger.info(f"- {guild_name} (Active)")
             else:
                 logger.info(f"- {guild_name} (Bot not in server)")
-        
-
-            
     except Exception as e:
-        logger.error(f"Failed to sync commands: {e}")
-        print(f"Failed to sync commands: {e}")
-
-    # Check if config exists on startup
-    settings = load_config()
-    if settings:
-        bot.loop.create_task(update_player_list_and_forum_comments())
-        bot.loop.create_task(monitor_replies())  # RE-ENABLED - reads JSON files updated by forum_monitor.py
-        bot.loop.create_task(check_watchlists())
-        # bot.loop.create_task(they_gotta_go())  # DISABLED - using watchlist instead
+        logger.error(f"Error in on_ready: {e}")
 
 # Loading blocked guilds from file
 def load_blocked_guilds():
@@ -222,6 +504,7 @@ async def unblock_guild(interaction: discord.Interaction, guild_id: str):
     await interaction.followup.send(f"Blocked guilds after unblocking: {blocked_guilds}")
 
 # Global check to prevent commands in blocked guilds and enforce channel restrictions
+@command_stats.timed("check")
 async def check_guild(interaction: discord.Interaction) -> bool:
     # Check if guild is blocked
     if interaction.guild and interaction.guild.id in blocked_guilds:
@@ -256,6 +539,7 @@ async def check_guild(interaction: discord.Interaction) -> bool:
     return True  # Allow the command
 
 
+@command_stats.timed("load")
 def load_config():
     if not os.path.exists(CONFIG_FILE):
         return {}  # Return an empty dict if the file doesn't exist.
@@ -335,6 +619,7 @@ async def remove(interaction: discord.Interaction):
         await interaction.response.send_message("No configuration found for this server.")
 
 
+@command_stats.timed("load")
 def load_forum_data(topic_id):
     json_file_path = os.path.join(DATA_DIR, f"forum_{topic_id}.json")  # Generate path based on topic_id
     if os.path.exists(json_file_path):
@@ -342,19 +627,145 @@ def load_forum_data(topic_id):
             return json.load(forum_file)
     return {}
 
+def get_forum_data_version(topic_id):
+    """Identify the current forum file of a topic; forum_monitor rewrites it on every change."""
+    try:
+        stat = os.stat(os.path.join(DATA_DIR, f"forum_{topic_id}.json"))
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+@command_stats.timed("load")
+def load_snapshot_heartbeat():
+    """Load the writer's freshness record (syncTime, content hash) without parsing the snapshot."""
+    heartbeat_path = os.path.join(DATA_DIR, 'player_list_heartbeat.json')
+    try:
+        with open(heartbeat_path, "r") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+@command_stats.timed("load")
+def get_player_data_version():
+    """Identify the current player snapshot, preferring the content hash from the heartbeat."""
+    heartbeat = load_snapshot_heartbeat()
+    if heartbeat.get("hash"):
+        return heartbeat["hash"]
+    try:
+        stat = os.stat(os.path.join(DATA_DIR, 'player_list.json'))
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+# Parsed player_list.json, reused until the snapshot version changes; callers must not modify it
+player_data_cache = {"version": None, "data": {}}
+player_data_lock = threading.Lock()  # Cached renders load from worker threads
+
+@command_stats.timed("load")
 def load_player_data():
     player_list_path = os.path.join(DATA_DIR, 'player_list.json')
     player_data = {}
 
-    # Load player_list.json
-    if os.path.exists(player_list_path):
-        with open(player_list_path, "r") as file:
-            player_data = json.load(file)
-    else:
-        print("player_list.json does not exist.")
+    with player_data_lock:
+        version = get_player_data_version()
+        if version is not None and version == player_data_cache["version"]:
+            CACHE_REQUESTS.inc(cache="player_data", result="hit")
+            return player_data_cache["data"]
+        CACHE_REQUESTS.inc(cache="player_data", result="miss")
+
+        # Load player_list.json
+        if os.path.exists(player_list_path):
+            with open(player_list_path, "r") as file:
+                player_data = json.load(file)
+            player_data_cache["version"] = version
+            player_data_cache["data"] = player_data
+        else:
+            print("player_list.json does not exist.")
 
     return player_data
 
+def snapshot_age():
+    """Seconds since the syncTime of the snapshot the bot is serving, for alerting on staleness."""
+    sync_time = load_snapshot_heartbeat().get("syncTime")
+    if not sync_time:
+        return None
+    return time.time() - datetime.fromisoformat(sync_time.replace('Z', '+00:00')).timestamp()
+
+metrics.gauge('lsrp_snapshot_age_seconds', 'Seconds since the syncTime of the served snapshot', function=snapshot_age)
+
+# Memory-mapped reader for the opt-in binary snapshot written by setup_db.py
+snapshot_reader = SnapshotReader(os.path.join(DATA_DIR, 'player_list.bin')) if USE_BINARY_SNAPSHOT else None
+
+# accountName -> characters played on it, folded in once per snapshot version; only used on the event loop
+account_index = AccountIndex(os.path.join(DATA_DIR, 'account_index.json'))
+account_index.load()
+ACCOUNT_PREFIX = "account:"  # Watchlist entries that match any character of an account
+
+def update_account_index():
+    version = get_player_data_version()
+    if version is None or version == account_index.version:
+        return
+    links_changed = account_index.update(load_player_data(), version)
+    account_index.save_if_needed(force=links_changed)
+
+def watched_character(entry, online_players):
+    """Online character matching a watchlist entry, a character name or `account:Name`."""
+    if entry.lower().startswith(ACCOUNT_PREFIX):
+        characters = account_index.online_characters(entry[len(ACCOUNT_PREFIX):])
+        return min(characters) if characters else None
+    return entry if entry in online_players else None
+
+# Flag bitsets of the current snapshot, built once per version and shared by every filter
+flag_index_cache = {"version": None, "index": None}
+flag_index_lock = threading.Lock()  # Cached renders build it from worker threads
+
+@command_stats.timed("load")
+def get_flag_index():
+    with flag_index_lock:
+        version = get_player_data_version()
+        if version is not None and version == flag_index_cache["version"]:
+            CACHE_REQUESTS.inc(cache="flag_index", result="hit")
+            return flag_index_cache["index"]
+        CACHE_REQUESTS.inc(cache="flag_index", result="miss")
+        index = None
+        if snapshot_reader is not None:
+            try:
+                index = snapshot_reader.flag_index()
+            except (OSError, ValueError, RuntimeError) as e:
+                logger.debug(f"Binary snapshot unavailable, falling back to JSON: {e}")
+        if index is None:
+            index = FlagIndex.from_player_data(load_player_data())
+        flag_index_cache["version"] = version
+        flag_index_cache["index"] = index
+        return index
+
+def parse_flag_filter(text):
+    """Parse "police|medic" (either) and "admin&premium" (both) into flag groups and a canonical spelling."""
+    groups = set()
+    for part in re.split(r"[|,]", text.lower()):
+        terms = {term.strip() for term in re.split(r"[&+]", part) if term.strip()}
+        if not terms:
+            continue
+        unknown = sorted(terms - FILTER_FLAGS.keys())
+        if unknown:
+            raise ValueError(f"Unknown flag {', '.join(unknown)}, use {', '.join(FILTER_FLAGS)}.")
+        groups.add(tuple(sorted(terms)))
+    if not groups:
+        raise ValueError("Empty filter, use flags like police|medic or admin&premium.")
+    groups = sorted(groups)
+    return [[FILTER_FLAGS[term] for term in group] for group in groups], "|".join("&".join(group) for group in groups)
+
+@command_stats.timed("load")
+def get_online_names():
+    """Character names currently online, straight from the mmap snapshot when enabled."""
+    if snapshot_reader is not None:
+        try:
+            return snapshot_reader.names()
+        except (OSError, ValueError, RuntimeError) as e:
+            logger.debug(f"Binary snapshot unavailable, falling back to JSON: {e}")
+    return [player["characterName"] for player in load_player_data().get("players", [])]
+
+@command_stats.timed("load")
 def load_last_seen():
     last_seen_path = os.path.join(DATA_DIR, 'last_seen.json')
     last_seen_data = {}
@@ -377,12 +788,12 @@ def format_date(date_str):
 
 def clean_html(raw_html):
     """Strip HTML tags and extract information about images or videos from the given HTML string."""
-    print("Raw HTML:", raw_html)  # Debug: print the raw HTML
+    from bs4 import BeautifulSoup  # Loaded on first use, only forum notifications need it
+
     soup = BeautifulSoup(raw_html, 'html.parser')
 
     # Extract the text
     text = soup.get_text(strip=True)
-    print("Extracted Text:", text)  # Debug: print the extracted text
 
     # Initialize media presence flags
     contains_images = False
@@ -422,7 +833,7 @@ async def info(interaction: discord.Interaction):
    - `/setup CHANNEL_ID` - Set the notification channel only (enables UCP monitoring).
    - `/setup CHANNEL_ID TOPIC_ID` - Set both the channel and topic (enables UCP and forum monitoring).
 2. **/remove** - Admin command to delete the current bot configuration for this server, disabling all functionalities.
-3. **/online** - Displays a list of all logged-in players.
+3. **/online [filter]** - Displays a list of all logged-in players, optionally only those with some flags (`police|medic` for either, `admin&premium` for both).
 4. **/admins** - Shows a list of currently online admins.
 5. **/testers** - Lists all logged-in testers.
 6. **/check FirstName_LastName** - Checks if the specified player is currently online.
@@ -430,6 +841,10 @@ async def info(interaction: discord.Interaction):
 8. **/thread** - Shows how many replies are left for the next page.
 9. **/show_settings** - Shows the current configuration of the bot.
 10. **/last_online FirstName_LastName** - Displays the last online status of the specified player.
+11. **/status_board True|False** - Admin command to post (or remove) a pinned board in the notification channel that updates as players log in and out.
+12. **/account AccountName** - Lists the characters seen on an account (or the account of a character), unless its owner hides it.
+13. **/staff** - Counts the online admins, testers, developers, premium players, police and medics.
+14. **/population [range] [role]** - Charts how many players (or players with a flag) were online over the last 24h, 7d, 30d or 1y, with the peak, average and busiest hour.
 """
 
     embed.description = helpMessage
@@ -463,33 +878,35 @@ async def latest(interaction: discord.Interaction):
     
     if guild_id in settings and settings[guild_id]["topic_id"]:
         topic_id = settings[guild_id]["topic_id"]
-        replies = load_forum_data(topic_id)  # Load replies for the specific topic_id
-        
-        if replies:
-            last_reply = replies[-1]  # Get the last reply
-            author_name = last_reply['author']['formattedName']
-            content, media_message = clean_html(last_reply.get("content", "No content available."))
-            url = last_reply['url']
-            date = format_date(last_reply['date'])
-
-            if media_message:
-                content += "\n" + media_message 
-
-            if len(content) > 1024:
-                content = content[:1021] + '...'  # Truncate long content
-
-            embed = discord.Embed(title="Last Reply", color=discord.Color.red())
-            embed.add_field(name="Author", value=author_name, inline=True)
-            embed.add_field(name="Content", value=content, inline=False)
-            embed.add_field(name="Link", value=url, inline=False)
-            embed.add_field(name="Date", value=date, inline=True)
-
-            await interaction.response.send_message(embed=embed)
-        else:
-            await interaction.response.send_message("No replies found.")
+        response = await cached_response("latest", (topic_id,), get_forum_data_version(topic_id), lambda: render_latest(topic_id))
+        await interaction.response.send_message(**response)
     else:
         await interaction.response.send_message("Please set up a topic ID first using `/setup channel_id topic_id`.")
 
+def render_latest(topic_id):
+    replies = load_forum_data(topic_id)  # Load replies for the specific topic_id
+    if not replies:
+        return {"content": "No replies found."}
+
+    last_reply = replies[-1]  # Get the last reply
+    author_name = last_reply['author']['formattedName']
+    content, media_message = clean_html(last_reply.get("content", "No content available."))
+    url = last_reply['url']
+    date = format_date(last_reply['date'])
+
+    if media_message:
+        content += "\n" + media_message 
+
+    if len(content) > 1024:
+        content = content[:1021] + '...'  # Truncate long content
+
+    embed = discord.Embed(title="Last Reply", color=discord.Color.red())
+    embed.add_field(name="Author", value=author_name, inline=True)
+    embed.add_field(name="Content", value=content, inline=False)
+    embed.add_field(name="Link", value=url, inline=False)
+    embed.add_field(name="Date", value=date, inline=True)
+    return {"embed": embed}
+
 @bot.tree.command(name="thread", description="Displays the current number of replies and how many are left for the next page.")
 @app_commands.check(check_guild)
 async def thread(interaction: discord.Interaction):
@@ -499,80 +916,171 @@ async def thread(interaction: discord.Interaction):
 
     if guild_id in settings and settings[guild_id]["topic_id"]:
         topic_id = settings[guild_id]["topic_id"]
-        replies = load_forum_data(topic_id)  # Load replies for the specific topic_id
+        response = await cached_response("thread", (topic_id,), get_forum_data_version(topic_id), lambda: render_thread(topic_id))
+        await interaction.response.send_message(**response)
+    else:
+        await interaction.response.send_message("Please set up a topic ID first using `/setup channel_id topic_id`.")
 
-        if replies:
-            current_replies = len(replies)
-            replies_left = 15 - current_replies  # Assuming 15 replies per page
+def render_thread(topic_id):
+    replies = load_forum_data(topic_id)  # Load replies for the specific topic_id
+    if not replies:
+        return {"content": "No replies found."}
 
-            embed = discord.Embed(title="Replies Status", color=discord.Color.red())
-            embed.add_field(name="Current Replies", value=current_replies, inline=False)
-            embed.add_field(name="Replies Left for New Page", value=replies_left, inline=False)
+    current_replies = len(replies)
+    replies_left = 15 - current_replies  # Assuming 15 replies per page
+
+    embed = discord.Embed(title="Replies Status", color=discord.Color.red())
+    embed.add_field(name="Current Replies", value=current_replies, inline=False)
+    embed.add_field(name="Replies Left for New Page", value=replies_left, inline=False)
+    return {"embed": embed}
 
-            await interaction.response.send_message(embed=embed)
-        else:
-            await interaction.response.send_message("No replies found.")
-    else:
-        await interaction.response.send_message("Please set up a topic ID first using `/setup channel_id topic_id`.")
 
+# Rendered read-only responses, shared by every caller until the data they were built from changes
+response_cache = ResponseCache()
+metrics.gauge('lsrp_response_cache_entries', 'Rendered responses held by the response cache', function=lambda: len(response_cache))
+
+@command_stats.timed("load")
+async def cached_response(command, args, version, render):
+    """Run `render` in a worker thread once per (command, args, data version) and share the result.
+
+    The player snapshot version is the heartbeat's content hash, which ignores syncTime: a
+    render must not show syncTime or anything derived from it, or it would go stale.
+    """
+    if version is None:
+        return await asyncio.to_thread(render)
+    response, result = await response_cache.get((command, args, version), lambda: asyncio.to_thread(render))
+    CACHE_REQUESTS.inc(cache="responses", result=result)
+    return response
 
 @bot.tree.command(name="admins", description="Show online administrators")
 @app_commands.check(check_guild)
 async def admins(interaction: discord.Interaction):
-    player_data = load_player_data()
-    embed = discord.Embed(title="Online Admins", color=discord.Color.red())
-    
-    if not player_data or "players" not in player_data:
-        await interaction.response.send_message("No player data available.")
-        return
-
-    admin_names = []
-    for player in player_data["players"]:
-        if player.get("isAdmin", False):
-            character_name = player.get("characterName", "Unknown")
-            account_name = player.get("accountName", "Unknown")
-            admin_names.append(f"{character_name} **({account_name})**")
-
-    embed.description = "\n".join(admin_names) if admin_names else "No admins are currently logged in."
-    await interaction.response.send_message(embed=embed)
+    response = await cached_response(
+        "admins", (), get_player_data_version(),
+        lambda: render_flag_list("isAdmin", "Online Admins", "No admins are currently logged in.")
+    )
+    await interaction.response.send_message(**response)
 
 
 @bot.tree.command(name="testers", description="Show online testers")
 @app_commands.check(check_guild)
 async def testers(interaction: discord.Interaction):
-    player_data = load_player_data()
-    embed = discord.Embed(title="Online Testers", color=discord.Color.red())
+    response = await cached_response(
+        "testers", (), get_player_data_version(),
+        lambda: render_flag_list("isTester", "Online Testers", "No testers are currently logged in.")
+    )
+    await interaction.response.send_message(**response)
 
+def render_flag_list(flag, title, empty_message):
+    """Online players with `flag` set, as send_message arguments."""
+    player_data = load_player_data()
     if not player_data or "players" not in player_data:
-        await interaction.response.send_message("No player data available.")
-        return
+        return {"content": "No player data available."}
 
-    tester_names = []
-    for player in player_data["players"]:
-        if player.get("isTester", False):
-            character_name = player.get("characterName", "Unknown")
-            account_name = player.get("accountName", "Unknown")
-            tester_names.append(f"{character_name} **({account_name})**")
+    # Rows are sorted by name and hidden accounts stay hidden, whichever snapshot the index came from
+    index = get_flag_index()
+    names = [f"{index.names[row]} **({index.accounts[row] or 'hidden'})**" for row in index.rows(index.bitsets[flag])]
 
-    embed.description = "\n".join(tester_names) if tester_names else "No testers are currently logged in."
-    await interaction.response.send_message(embed=embed)
+    embed = discord.Embed(title=title, color=discord.Color.red())
+    embed.description = "\n".join(names) if names else empty_message
+    return {"embed": embed}
 
 
     
+def split_lines(lines, limit):
+    """Group lines into blocks of at most `limit` characters without breaking a line."""
+    blocks = []
+    current = []
+    size = 0
+    for line in lines:
+        if current and size + 1 + len(line) > limit:
+            blocks.append("\n".join(current))
+            current, size = [], 0
+        size += len(line) + (1 if current else 0)
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+def build_online_pages(player_names, flag_filter=None):
+    """Render the online list as one embed per page, split on line boundaries."""
+    blocks = split_lines(player_names, ONLINE_PAGE_CHARS) or ["No players online."]
+    title = f"Online Players ({len(player_names)})" if not flag_filter else f"Online Players: {flag_filter} ({len(player_names)})"
+    pages = []
+    for index, block in enumerate(blocks):
+        embed = discord.Embed(title=title, description=block, color=discord.Color.red())
+        # The pager reads the page and the filter back from the footer
+        embed.set_footer(text=f"Page {index + 1}/{len(blocks)}" + (f" · {flag_filter}" if flag_filter else ""))
+        pages.append(embed)
+    return pages
+
+async def get_online_pages(flag_filter=None):
+    """Pages of the current snapshot, shared by every guild and every pager click."""
+    if not flag_filter:
+        return await cached_response("online", (), get_player_data_version(), lambda: build_online_pages(get_online_names()))
+
+    groups, canonical = parse_flag_filter(flag_filter)
+    def render():
+        index = get_flag_index()
+        return build_online_pages([index.names[row] for row in index.rows(index.select(groups))], canonical)
+    return await cached_response("online", (canonical,), get_player_data_version(), render)
+
+class OnlinePager(View):
+    """Persistent prev/next buttons for /online; the current page is read back from the embed footer."""
+
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return not (interaction.guild and interaction.guild.id in blocked_guilds)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary, custom_id="online:previous")
+    async def previous_page(self, interaction: discord.Interaction, button: Button):
+        await self.flip(interaction, -1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary, custom_id="online:next")
+    async def next_page(self, interaction: discord.Interaction, button: Button):
+        await self.flip(interaction, 1)
+
+    async def flip(self, interaction: discord.Interaction, step):
+        current = 0
+        flag_filter = None
+        embeds = interaction.message.embeds if interaction.message else []
+        if embeds and embeds[0].footer and embeds[0].footer.text:
+            match = re.match(r"Page (\d+)/\d+(?: · (.+))?", embeds[0].footer.text)
+            if match:
+                current = int(match.group(1)) - 1
+                flag_filter = match.group(2)
+        pages = await get_online_pages(flag_filter)
+        # The snapshot may have changed since the message was sent, wrap onto the new page count
+        page = (current + step) % len(pages)
+        await interaction.response.edit_message(embed=pages[page], view=self)
+
 @bot.tree.command(name="online", description="Display all online players")
 @app_commands.check(check_guild)
-async def online(interaction: discord.Interaction):
+@app_commands.rename(flag_filter="filter")
+@app_commands.describe(flag_filter="Only players with these flags, e.g. police|medic or admin&premium")
+async def online(interaction: discord.Interaction, flag_filter: str = None):
     try:
         # Check if interaction is still valid before any response
         if interaction.response.is_done():
             logger.debug("Interaction already responded to in /online")
             return
 
+        if flag_filter:
+            try:
+                parse_flag_filter(flag_filter)
+            except ValueError as e:
+                await interaction.response.send_message(str(e), ephemeral=True)
+                return
+
         # Defer the interaction to prevent timeout
         try:
             await interaction.response.defer()
+            command_stats.mark_deferred(interaction)
         except discord.NotFound:
             logger.debug("Interaction expired before defer() in /online")
+            command_stats.record_expired(interaction)
             return
         except discord.errors.InteractionResponded:
             logger.debug("Interaction already responded to before defer() in /online")
@@ -584,28 +1092,20 @@ async def online(interaction: discord.Interaction):
                 await interaction.followup.send("No player data available.")
             except discord.NotFound:
                 logger.debug("Interaction expired before followup.send() in /online [no data]")
+                command_stats.record_expired(interaction)
             except discord.errors.WebhookTokenMissing:
                 logger.debug("Webhook token missing - interaction likely expired")
             return
 
-        player_names = [player["characterName"] for player in player_data["players"]]
-        player_count = len(player_names)
-        response = "\n".join(player_names)
-        embed = discord.Embed(title=f"Online Players ({player_count})", color=discord.Color.red())
-
         try:
-            if len(response) > 4096:
-                chunks = [response[i:i + 4096] for i in range(0, len(response), 4096)]
-                embed.description = chunks[0]
-                await interaction.followup.send(embed=embed)
-                for chunk in chunks[1:]:
-                    embed_chunk = discord.Embed(description=chunk, color=discord.Color.red())
-                    await interaction.followup.send(embed=embed_chunk)
+            pages = await get_online_pages(flag_filter)
+            if len(pages) > 1:
+                await interaction.followup.send(embed=pages[0], view=bot.online_pager)
             else:
-                embed.description = response if response else "No players online."
-                await interaction.followup.send(embed=embed)
+                await interaction.followup.send(embed=pages[0])
         except discord.NotFound:
             logger.debug("Interaction expired before final followup.send() in /online")
+            command_stats.record_expired(interaction)
         except discord.errors.WebhookTokenMissing:
             logger.debug("Webhook token missing - interaction likely expired")
 
@@ -622,11 +1122,75 @@ async def online(interaction: discord.Interaction):
 
 
 
+@bot.tree.command(name="staff", description="Count online players by role")
+@app_commands.check(check_guild)
+async def staff(interaction: discord.Interaction):
+    response = await cached_response("staff", (), get_player_data_version(), render_staff)
+    await interaction.response.send_message(**response)
+
+def render_staff():
+    index = get_flag_index()
+    embed = discord.Embed(title=f"Online Players ({len(index)})", color=discord.Color.red())
+    for name, flag in FILTER_FLAGS.items():
+        embed.add_field(name=name.capitalize(), value=str(index.count(flag)), inline=True)
+    return {"embed": embed}
+
+
+@bot.tree.command(name="population", description="Show how many players were online over time")
+@app_commands.check(check_guild)
+@app_commands.rename(time_range="range")
+@app_commands.describe(time_range="How far back to look (default 24h)", role="Only count players with this flag")
+@app_commands.choices(
+    time_range=[app_commands.Choice(name=key, value=key) for key in POPULATION_RANGES],
+    role=[app_commands.Choice(name=name, value=name) for name in FILTER_FLAGS],
+)
+async def population(interaction: discord.Interaction, time_range: app_commands.Choice[str] = None, role: app_commands.Choice[str] = None):
+    range_key = time_range.value if time_range else "24h"
+    role_key = role.value if role else None
+    response = await cached_response(
+        "population", (range_key, role_key), get_population_version(), lambda: render_population(range_key, role_key)
+    )
+    await interaction.response.send_message(**response)
+
+def get_population_version():
+    try:
+        stat = os.stat(POPULATION_FILE)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+def render_population(range_key, role):
+    """Sparkline, peak, average and busiest hours of one series over a range."""
+    resolution, points = PopulationHistory.load(POPULATION_FILE).query(POPULATION_RANGES[range_key], FILTER_FLAGS.get(role, "players"))
+    filled = [point for point in points if point[1] is not None]
+    if not filled:
+        return {"content": "No population history recorded for this range yet."}
+
+    format_time = lambda timestamp: datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %I:%M %p UTC")
+    peak_time, _, peak = max(filled, key=lambda point: point[2])
+    average = sum(point[1] for point in filled) / len(filled)
+    by_hour = defaultdict(list)
+    for start, value, _ in filled:
+        by_hour[datetime.fromtimestamp(start, timezone.utc).hour].append(value)
+    hourly = {hour: sum(values) / len(values) for hour, values in by_hour.items()}
+    busiest = max(hourly, key=hourly.get)
+    quietest = min(hourly, key=hourly.get)
+
+    label = role.capitalize() if role else "Players"
+    embed = discord.Embed(title=f"{label} online, last {range_key}", color=discord.Color.red())
+    embed.description = f"```\n{sparkline([point[1] for point in points], SPARKLINE_WIDTH)}\n```\n{format_time(points[0][0])} → now"
+    embed.add_field(name="Peak", value=f"{peak:.0f} at {format_time(peak_time)}", inline=False)
+    embed.add_field(name="Average", value=f"{average:.0f}", inline=True)
+    embed.add_field(name="Busiest hour", value=f"{busiest:02d}:00 UTC ({hourly[busiest]:.0f})", inline=True)
+    embed.add_field(name="Quietest hour", value=f"{quietest:02d}:00 UTC ({hourly[quietest]:.0f})", inline=True)
+    embed.set_footer(text=f"{resolution // 60}-minute buckets, {len(filled)}/{len(points)} with data")
+    return {"embed": embed}
+
+
 @bot.tree.command(name="check", description="Check if a player is logged in.")
 @app_commands.check(check_guild)
 @app_commands.describe(name="The player's full name in the format Firstname_Lastname")
 async def check(interaction: discord.Interaction, name: str = None):
-    player_data = load_player_data()
     embed = discord.Embed(title="Player Status Check", color=discord.Color.red())
 
     # Check if name was provided
@@ -634,13 +1198,11 @@ async def check(interaction: discord.Interaction, name: str = None):
         await interaction.response.send_message("Please provide a name in the format Firstname_Lastname.")
         return
     
-    characters = [player["characterName"] for player in player_data.get("players", [])]
-
     if "_" not in name:  # Check if name contains '_'
         await interaction.response.send_message("Wrong format. Use Firstname_Lastname if you want the bot to work.")
         return
     
-    if name in characters:
+    if name in get_online_names():
         response = f"{name} is currently logged in!"
     else:
         response = f"{name} is not logged in."
@@ -648,6 +1210,28 @@ async def check(interaction: discord.Interaction, name: str = None):
     embed.description = response  # Set the response in the embed description
     await interaction.response.send_message(embed=embed)  # Send the embed message
 
+@bot.tree.command(name="account", description="Show the characters played on an account.")
+@app_commands.check(check_guild)
+@app_commands.describe(name="An account name, or a character name to find its account")
+async def account(interaction: discord.Interaction, name: str):
+    update_account_index()
+    result = account_index.lookup(name.strip())
+    if result is None:
+        await interaction.response.send_message("No characters known for that account, or its owner hides it.", ephemeral=True)
+        return
+
+    account_name, online_characters, history = result
+    lines = []
+    for character, last_seen in history:
+        if last_seen:
+            last_seen = datetime.strptime(last_seen, "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d %I:%M %p")
+        lines.append(f"{character} - last seen {last_seen or 'unknown'}")
+
+    embed = discord.Embed(title=f"Account {account_name}", color=discord.Color.red())
+    embed.add_field(name="Online as", value=", ".join(online_characters) or "Not online", inline=False)
+    embed.add_field(name=f"Characters ({len(history)})", value=field_lines(lines, "None"), inline=False)
+    await interaction.response.send_message(embed=embed)
+
 @bot.tree.command(name="last_online", description="Check the last seen time of a player.")
 @app_commands.check(check_guild)
 @app_commands.describe(full_name="The full name of the player (Firstname_Lastname).")
@@ -665,8 +1249,10 @@ async def last_online(interaction: discord.Interaction, full_name: str):
             
         try:
             await interaction.response.defer()
+            command_stats.mark_deferred(interaction)
         except discord.NotFound:
             logger.debug("Interaction expired before defer() in /last_online")
+            command_stats.record_expired(interaction)
             return
         except discord.errors.InteractionResponded:
             logger.debug("Interaction already responded to before defer() in /last_online")
@@ -675,6 +1261,13 @@ async def last_online(interaction: discord.Interaction, full_name: str):
         last_seen_data = load_last_seen()
         last_seen_time = last_seen_data.get(full_name)
 
+        # last_seen.json is only rewritten when the player set changes, so players
+        # still online were last seen at the latest heartbeat
+        heartbeat = load_snapshot_heartbeat()
+        if heartbeat.get("syncTime"):
+            if full_name in get_online_names():
+                last_seen_time = heartbeat["syncTime"]
+
         try:
             if last_seen_time:
                 last_seen_dt = datetime.strptime(last_seen_time, "%Y-%m-%dT%H:%M:%S.%fZ")
@@ -689,6 +1282,7 @@ async def last_online(interaction: discord.Interaction, full_name: str):
                 await interaction.followup.send(f"The player **{full_name}** does not appear to have a recorded last seen time.")
         except discord.NotFound:
             logger.debug("Interaction expired before followup.send() in /last_online")
+            command_stats.record_expired(interaction)
         except discord.errors.WebhookTokenMissing:
             logger.debug("Webhook token missing - interaction likely expired")
 
@@ -705,6 +1299,7 @@ async def last_online(interaction: discord.Interaction, full_name: str):
 
 
 # Watchlist Management (Per-Guild)
+@command_stats.timed("load")
 def load_watchlists():
     """Load all guilds' watchlists from file."""
     watchlists_file = os.path.join(DATA_DIR, 'watchlists.json')
@@ -728,53 +1323,74 @@ def set_guild_watchlist(guild_id, watchlist):
     watchlists[str(guild_id)] = watchlist
     save_watchlists(watchlists)
 
+async def run_watchlist_pass(watchlists, settings, online_players):
+    """Notify each configured channel about watched players who just came online."""
+    for guild_id, watchlist in watchlists.items():
+        # Initialize status tracking for this guild if not exists
+        if guild_id not in watchlist_last_online_status:
+            watchlist_last_online_status[guild_id] = {}
+        
+        # Initialize status for new players in watchlist
+        for player in watchlist:
+            if player not in watchlist_last_online_status[guild_id]:
+                watchlist_last_online_status[guild_id][player] = False
+        
+        channel_id = None
+        if guild_id in settings:
+            channel_id = settings[guild_id].get('notification_channel_id')
+        if not channel_id:
+            continue
+            
+        channel = bot.get_channel(int(channel_id))
+        if not channel:
+            continue
+        
+        # Use exact same logic as "They Gotta Go"
+        for player in watchlist:
+            character = watched_character(player, online_players)
+            # Check if player is online AND was not online before
+            if character and not watchlist_last_online_status[guild_id][player]:
+                try:
+                    if character == player:
+                        await channel.send(f"@everyone **{player}** is now online!")
+                    else:
+                        await channel.send(f"@everyone **{character}** ({player}) is now online!")
+                    MESSAGES_SENT.inc(route="watchlist")
+                    logger.info(f"Watchlist notification sent for {player} in guild {guild_id}")
+                except Exception as e:
+                    logger.error(f"Error sending watchlist notification: {e}")
+                # Set status to True (online)
+                watchlist_last_online_status[guild_id][player] = True
+            # If player is not online anymore, set status to False
+            elif not character and watchlist_last_online_status[guild_id][player]:
+                watchlist_last_online_status[guild_id][player] = False
+
+async def check_watchlists_once(last_evaluated=None):
+    """One check_watchlists iteration; returns the evaluation key to pass to the next one."""
+    watchlists = load_watchlists()
+    settings = load_config()
+
+    # Nothing to do until the player set, the watchlists or the config change
+    evaluation_key = (get_player_data_version(), json.dumps(watchlists, sort_keys=True), json.dumps(settings, sort_keys=True))
+    if last_evaluated is not None and evaluation_key[0] != last_evaluated[0]:
+        startup_profile.mark("first_scrape")
+    if evaluation_key == last_evaluated:
+        return last_evaluated
+
+    update_account_index()
+    online_players = set(get_online_names())
+    await run_watchlist_pass(watchlists, settings, online_players)
+    return evaluation_key
+
 async def check_watchlists():
     """Check all guilds' watchlists and send notifications to their channels."""
-    # Global status tracking like "They Gotta Go" system
-    global watchlist_last_online_status
+    last_evaluated = None
     
     while True:
+        # Hold notifications while the gateway is down, the scrapers keep collecting
+        await bot.gateway_connected.wait()
         try:
-            watchlists = load_watchlists()
-            player_data = load_player_data()
-            online_players = [player["characterName"] for player in player_data.get("players", [])]
-            settings = load_config()
-            
-            for guild_id, watchlist in watchlists.items():
-                # Initialize status tracking for this guild if not exists
-                if guild_id not in watchlist_last_online_status:
-                    watchlist_last_online_status[guild_id] = {}
-                
-                # Initialize status for new players in watchlist
-                for player in watchlist:
-                    if player not in watchlist_last_online_status[guild_id]:
-                        watchlist_last_online_status[guild_id][player] = False
-                
-                channel_id = None
-                if guild_id in settings:
-                    channel_id = settings[guild_id].get('notification_channel_id')
-                if not channel_id:
-                    continue
-                    
-                channel = bot.get_channel(int(channel_id))
-                if not channel:
-                    continue
-                
-                # Use exact same logic as "They Gotta Go"
-                for player in watchlist:
-                    # Check if player is online AND was not online before
-                    if player in online_players and not watchlist_last_online_status[guild_id][player]:
-                        try:
-                            await channel.send(f"@everyone **{player}** is now online!")
-                            logger.info(f"Watchlist notification sent for {player} in guild {guild_id}")
-                        except Exception as e:
-                            logger.error(f"Error sending watchlist notification: {e}")
-                        # Set status to True (online)
-                        watchlist_last_online_status[guild_id][player] = True
-                    # If player is not online anymore, set status to False
-                    elif player not in online_players and watchlist_last_online_status[guild_id][player]:
-                        watchlist_last_online_status[guild_id][player] = False
-                    
+            last_evaluated = await check_watchlists_once(last_evaluated)
             await asyncio.sleep(30)
         except Exception as e:
             logger.error(f"Error checking watchlists: {e}")
@@ -843,6 +1459,150 @@ watchlist_last_online_status = {}  # Format: {guild_id: {player_name: is_online}
 
 
 
+# Live "who's online" board, one opt-in pinned message per guild edited in place
+status_board_state = {}  # guild_id -> {"hash": content hash of the last edit, "edited": monotonic time}
+
+def status_board_summary(player_data):
+    """Guild-independent part of the board, computed once per pass."""
+    players = player_data.get("players", [])
+    # Same rule as /admins and /testers: a hidden account is never shown
+    label = lambda player: f"{player.get('characterName', 'Unknown')} ({visible_account(player) or 'hidden'})"
+    return {
+        "count": len(players),
+        "names": {player.get("characterName") for player in players},
+        "admins": [label(player) for player in players if player.get("isAdmin", False)],
+        "testers": [label(player) for player in players if player.get("isTester", False)],
+    }
+
+def field_lines(lines, empty):
+    """Fit lines into one embed field value, noting how many did not fit."""
+    if not lines:
+        return empty
+    blocks = split_lines(lines, 1000)
+    if len(blocks) == 1:
+        return blocks[0]
+    shown = blocks[0].count("\n") + 1
+    return f"{blocks[0]}\n…and {len(lines) - shown} more"
+
+def render_status_board(summary, watchlist):
+    """Board embed for one guild and the hash of its content, which excludes the timestamp."""
+    watched = []
+    for entry in watchlist:
+        character = watched_character(entry, summary["names"])
+        if character:
+            watched.append(character if character == entry else f"{character} ({entry})")
+    embed = discord.Embed(title="Who's Online", description=f"**{summary['count']}** players online", color=discord.Color.red())
+    embed.add_field(name=f"Admins ({len(summary['admins'])})", value=field_lines(summary["admins"], "No admins online."), inline=False)
+    embed.add_field(name=f"Testers ({len(summary['testers'])})", value=field_lines(summary["testers"], "No testers online."), inline=False)
+    embed.add_field(name=f"Watched players online ({len(watched)})", value=field_lines(watched, "None of the watched players are online."), inline=False)
+    content_hash = hashlib.sha256(json.dumps(embed.to_dict(), sort_keys=True).encode()).hexdigest()
+    embed.timestamp = discord.utils.utcnow()
+    embed.set_footer(text="Last updated")
+    return embed, content_hash
+
+async def update_status_boards_once(last_evaluated=None):
+    """Edit every board whose content changed; returns the key to pass to the next call."""
+    settings = load_config()
+    boards = {guild_id: config for guild_id, config in settings.items() if config.get("status_board_message_id")}
+    watchlists = load_watchlists()
+    evaluation_key = (get_player_data_version(), json.dumps(boards, sort_keys=True), json.dumps(watchlists, sort_keys=True))
+    if not boards or evaluation_key == last_evaluated:
+        return evaluation_key
+
+    update_account_index()  # Account entries of the watchlists resolve through it
+    summary = status_board_summary(load_player_data())
+    throttled = False
+    for guild_id, config in boards.items():
+        embed, content_hash = render_status_board(summary, watchlists.get(guild_id, []))
+        state = status_board_state.get(guild_id)
+        if state and state["hash"] == content_hash:
+            continue
+        if state and time.monotonic() - state["edited"] < STATUS_BOARD_MIN_EDIT_INTERVAL:
+            throttled = True  # Picked up by a later pass
+            continue
+        channel = bot.get_channel(int(config["notification_channel_id"]))
+        if not channel:
+            continue
+        try:
+            await channel.get_partial_message(int(config["status_board_message_id"])).edit(embed=embed)
+        except discord.NotFound:
+            logger.warning(f"Status board message for guild {guild_id} was deleted, disabling the board")
+            current = load_config()
+            current.get(guild_id, {}).pop("status_board_message_id", None)
+            save_config(current)
+            status_board_state.pop(guild_id, None)
+            continue
+        except discord.HTTPException as e:
+            logger.error(f"Error editing status board for guild {guild_id}: {e}")
+            continue
+        MESSAGES_SENT.inc(route="status_board")
+        status_board_state[guild_id] = {"hash": content_hash, "edited": time.monotonic()}
+        await asyncio.sleep(STATUS_BOARD_EDIT_SPACING)
+    return None if throttled else evaluation_key
+
+async def update_status_boards():
+    """Keep every enabled status board in sync with the latest snapshot."""
+    last_evaluated = None
+    while True:
+        await bot.gateway_connected.wait()
+        try:
+            last_evaluated = await update_status_boards_once(last_evaluated)
+        except Exception as e:
+            logger.error(f"Error updating status boards: {e}")
+        await asyncio.sleep(STATUS_BOARD_INTERVAL)
+
+@bot.tree.command(name="status_board", description="Post a live who's online board in the notification channel")
+@app_commands.check(check_guild)
+@app_commands.describe(enabled="Turn the board on or off")
+async def status_board(interaction: discord.Interaction, enabled: bool):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("You must have administrator permissions to use this command.", ephemeral=True)
+        return
+
+    settings = load_config()
+    guild_id = str(interaction.guild_id)
+    config = settings[guild_id]  # check_guild only lets configured guilds through
+    message_id = config.get("status_board_message_id")
+    channel = bot.get_channel(int(config["notification_channel_id"]))
+
+    if not enabled:
+        if not message_id:
+            await interaction.response.send_message("The status board is not enabled.", ephemeral=True)
+            return
+        config.pop("status_board_message_id")
+        save_config(settings)
+        status_board_state.pop(guild_id, None)
+        if channel:
+            try:
+                await channel.get_partial_message(int(message_id)).delete()
+            except discord.HTTPException:
+                pass  # Already gone or not ours to delete any more
+        await interaction.response.send_message("Status board disabled.", ephemeral=True)
+        return
+
+    if message_id:
+        await interaction.response.send_message("The status board is already enabled.", ephemeral=True)
+        return
+    if not channel:
+        await interaction.response.send_message("I can't access the notification channel.", ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True)
+    command_stats.mark_deferred(interaction)
+    embed, content_hash = render_status_board(status_board_summary(load_player_data()), load_watchlists().get(guild_id, []))
+    message = await channel.send(embed=embed)
+    MESSAGES_SENT.inc(route="status_board")
+    note = ""
+    try:
+        await message.pin()
+    except discord.HTTPException:
+        note = " I couldn't pin it, give me the Manage Messages permission to pin it."
+    config["status_board_message_id"] = message.id
+    save_config(settings)
+    status_board_state[guild_id] = {"hash": content_hash, "edited": time.monotonic()}
+    await interaction.followup.send(f"Status board posted in <#{channel.id}>, it updates when players log in or out.{note}", ephemeral=True)
+
+
 def is_owner(interaction: discord.Interaction) -> bool:
     """Check if the user is the bot owner."""
     return interaction.user.id == bot.owner_id
@@ -852,7 +1612,7 @@ def is_owner(interaction: discord.Interaction) -> bool:
 @app_commands.check(check_guild)
 @app_commands.describe(
     action="Action to perform: add, remove, edit, or list",
-    player="Player name(s), comma or space separated (optional for edit/list)"
+    player="Player name(s) or account:AccountName, comma or space separated (optional for edit/list)"
 )
 @app_commands.choices(
     action=[
@@ -871,7 +1631,9 @@ async def watch(
         # Make list action public, others ephemeral
         is_ephemeral = action.value != "list"
         await interaction.response.defer(ephemeral=is_ephemeral)
+        command_stats.mark_deferred(interaction)
     except discord.errors.NotFound:
+        command_stats.record_expired(interaction)
         return  # Interaction expired or already responded to
     guild_id = str(interaction.guild_id)
     watchlist = get_guild_watchlist(guild_id)
@@ -883,8 +1645,13 @@ async def watch(
         invalid_format = []
         
         for name in names:
+            if name.lower().startswith(ACCOUNT_PREFIX):
+                # Account entries match whichever character the account is playing
+                if not name[len(ACCOUNT_PREFIX):]:
+                    invalid_format.append(name)
+                    continue
             # Validate name format (must contain exactly one underscore)
-            if "_" not in name or name.count("_") != 1:
+            elif "_" not in name or name.count("_") != 1:
                 invalid_format.append(name)
                 continue
                 
@@ -901,7 +1668,7 @@ async def watch(
         if already:
             msg.append(f"Already in watchlist: {', '.join(already)}.")
         if invalid_format:
-            msg.append(f"Invalid format (use FirstName_LastName): {', '.join(invalid_format)}.")
+            msg.append(f"Invalid format (use FirstName_LastName or account:AccountName): {', '.join(invalid_format)}.")
         if not msg:
             msg = ["No valid names provided."]
         await interaction.followup.send(" ".join(msg), ephemeral=True)
@@ -961,14 +1728,16 @@ async def watch(
     elif action_value == "list":
         if watchlist:
             # Get current online players to show status
-            player_data = load_player_data()
-            online_players = [player["characterName"] for player in player_data.get("players", [])]
+            online_players = set(get_online_names())
             
             # Format watchlist with online status
             formatted_list = []
             for name in watchlist:
-                if name in online_players:
+                character = watched_character(name, online_players)
+                if character == name:
                     formatted_list.append(f"{name} **(online)**")
+                elif character:
+                    formatted_list.append(f"{name} **(online as {character})**")
                 else:
                     formatted_list.append(name)
             
@@ -981,6 +1750,150 @@ async def watch(
         await interaction.followup.send("Invalid action. Use 'add', 'remove', 'edit', or 'list'.", ephemeral=True)
 
 
+@bot.tree.command(name="scrapers", description="Show the status of the scraper processes")
+@app_commands.check(is_owner)  # Only bot owner can use this command
+async def scrapers(interaction: discord.Interaction):
+    embed = discord.Embed(title="Scraper Processes", color=discord.Color.red())
+    for child in scraper_supervisor.status():
+        state = f"running (pid {child['pid']})" if child["running"] else "stopped"
+        uptime = str(timedelta(seconds=int(child["uptime"])))
+        embed.add_field(
+            name=child["name"],
+            value=f"Status: {state}\nUptime: {uptime}\nRestarts: {child['restarts']}\nLast exit code: {child['last_exit_code']}",
+            inline=False
+        )
+    tasks = [
+        f"{name}: {'running' if running else 'stopped'} (restarts: {restarts})"
+        for name, (running, restarts) in background_tasks.status().items()
+    ]
+    embed.add_field(name="Background tasks", value="\n".join(tasks) or "None", inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@bot.tree.command(name="lag", description="Show event loop lag and the worst blocking call sites")
+@app_commands.check(is_owner)  # Only bot owner can use this command
+@app_commands.describe(reset="Clear the collected samples after showing them")
+async def lag(interaction: discord.Interaction, reset: bool = False):
+    embed = discord.Embed(title="Event Loop Lag", color=discord.Color.red())
+    samples = loop_lag_monitor.samples
+    average = loop_lag_monitor.total_lag / samples if samples else 0.0
+    embed.description = (
+        f"Samples: {samples}\n"
+        f"Average: {average * 1000:.1f} ms, p50 <= {loop_lag_monitor.percentile(0.5) * 1000:.0f} ms, "
+        f"p99 <= {loop_lag_monitor.percentile(0.99) * 1000:.0f} ms, max: {loop_lag_monitor.max_lag * 1000:.0f} ms"
+    )
+
+    histogram = "\n".join(
+        f"<= {bound * 1000:>6.0f} ms: {count}" if bound != float('inf') else f" > {10000:>6} ms: {count}"
+        for bound, count in loop_lag_monitor.histogram() if count
+    )
+    embed.add_field(name="Histogram", value=f"```{histogram or 'No samples yet'}```", inline=False)
+
+    offenders = loop_lag_monitor.worst_offenders()
+    for number, (location, stats) in enumerate(offenders):
+        name = location[:256]
+        summary = f"{stats['count']} stalls, total {stats['total']:.2f}s, max {stats['max']:.2f}s\n"
+        # The remaining offenders share what is left of the embed's total limit, keeping the stack tails
+        share = (MAX_EMBED_CHARS_PER_MESSAGE - 100 - len(embed)) // (len(offenders) - number)
+        stack_chars = max(0, min(900, share - len(name) - len(summary) - len("``````")))
+        embed.add_field(
+            name=name,
+            value=summary + (f"```{stats['stack'][-stack_chars:]}```" if stack_chars else ""),
+            inline=False
+        )
+    if not offenders:
+        embed.add_field(name="Blocking call sites", value="None captured yet.", inline=False)
+
+    if reset:
+        loop_lag_monitor.reset()
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@bot.tree.command(name="perf", description="Show per-command latency percentiles")
+@app_commands.check(is_owner)  # Only bot owner can use this command
+async def perf(interaction: discord.Interaction):
+    embed = discord.Embed(title="Command Latency (ms, p50/p95/p99)", color=discord.Color.red())
+    rows = command_stats.command_summary()
+    for command, calls, errors, expired, phases in rows[:20]:
+        lines = [f"calls {calls}, errors {errors}, expired {expired}"]
+        for phase in ("total", "check", "defer", "load", "send"):
+            if phase in phases:
+                p50, p95, p99 = (value * 1000 for value in phases[phase])
+                lines.append(f"{phase:<5} {p50:7.1f} {p95:7.1f} {p99:7.1f}")
+        embed.add_field(name=f"/{command}", value="```" + "\n".join(lines) + "```", inline=False)
+    if not rows:
+        embed.description = "No commands recorded yet."
+
+    guild_lines = []
+    for guild_id, samples, p50, p95, p99 in command_stats.guild_summary():
+        guild = bot.get_guild(guild_id)
+        name = guild.name if guild else str(guild_id)
+        guild_lines.append(f"{name[:24]:<24} n={samples:<4} {p50 * 1000:6.0f} {p95 * 1000:6.0f} {p99 * 1000:6.0f}")
+    if guild_lines:
+        embed.add_field(name="Slowest guilds (total)", value="```" + "\n".join(guild_lines) + "```", inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+active_profile = None  # ProfileSession currently collecting, at most one at a time
+profile_auto_stop = None  # Task that ends the active profile after its window
+profile_baseline = None  # Task taking the active profile's starting allocation snapshot
+
+async def finish_profile():
+    """Stop the active profile and write its reports, returning the summary text."""
+    global active_profile, profile_auto_stop, profile_baseline
+    session, active_profile = active_profile, None
+    if profile_auto_stop is not None and profile_auto_stop is not asyncio.current_task():
+        profile_auto_stop.cancel()
+    profile_auto_stop = None
+    session.stop()
+    baseline, profile_baseline = profile_baseline, None
+    await baseline
+    # Taking and comparing tracemalloc snapshots and dumping stats takes a while, keep it off the loop
+    return await asyncio.to_thread(session.write_reports)
+
+async def auto_stop_profile(interaction: discord.Interaction, session):
+    await asyncio.sleep(session.seconds)
+    if active_profile is not session:
+        return
+    summary = await finish_profile()
+    logger.info(f"Profile {session.name} finished")
+    await interaction.followup.send(f"```{summary[:1980]}```", ephemeral=True)
+
+
+@bot.tree.command(name="profile", description="Profile the running bot for a bounded window")
+@app_commands.check(is_owner)  # Only bot owner can use this command
+@app_commands.describe(
+    action="Start or stop profiling; the allocation snapshots taken then can pause the bot on a large heap",
+    mode="cprofile for exact call counts, sampling for low overhead stacks",
+    seconds=f"Stop automatically after this many seconds (max {profiling.MAX_PROFILE_SECONDS})"
+)
+@app_commands.choices(
+    action=[app_commands.Choice(name="start", value="start"), app_commands.Choice(name="stop", value="stop")],
+    mode=[app_commands.Choice(name=mode, value=mode) for mode in profiling.MODES]
+)
+async def profile(interaction: discord.Interaction, action: str, mode: str = "sampling", seconds: int = 60):
+    global active_profile, profile_auto_stop, profile_baseline
+    if action == "start":
+        if active_profile is not None:
+            await interaction.response.send_message(f"A {active_profile.mode} profile is already running.", ephemeral=True)
+            return
+        seconds = max(1, min(seconds, profiling.MAX_PROFILE_SECONDS))
+        active_profile = profiling.ProfileSession(mode, seconds)
+        active_profile.start()
+        profile_baseline = asyncio.create_task(asyncio.to_thread(active_profile.take_baseline))
+        profile_auto_stop = asyncio.create_task(auto_stop_profile(interaction, active_profile))
+        logger.info(f"Profile {active_profile.name} started for {seconds}s")
+        await interaction.response.send_message(f"Started {mode} profiling for up to {seconds}s.", ephemeral=True)
+        return
+
+    if active_profile is None:
+        await interaction.response.send_message("No profile is running.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+    summary = await finish_profile()
+    await interaction.followup.send(f"```{summary[:1980]}```", ephemeral=True)
+
+
 @bot.event
 async def on_message(message):
     await bot.process_commands(message)  
@@ -1002,6 +1915,12 @@ async def on_app_command(interaction: discord.Interaction):
     
     logger.info(log_message)
 
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    command_stats.finish(interaction)
+    MESSAGES_SENT.inc(route="interaction")
+    startup_profile.mark("first_command")
+
 @bot.event
 async def on_command(ctx):
     """Log all prefix command executions"""
@@ -1030,6 +1949,52 @@ async def on_command_error(ctx, error):
     else:
         await ctx.send(f"An error occurred: {str(error)}")
 
+def reply_channel_key(topic_id, channel_id):
+    return f"{topic_id}:{channel_id}"
+
+async def run_replies_pass(settings, last_seen_reply_ids):
+    """Send each topic's new replies to every guild following it; updates last_seen_reply_ids in place.
+
+    last_seen_reply_ids holds, per topic, the replies present at the last pass and, per
+    "topic:channel" key, the replies delivered to that channel.
+    """
+    channels_by_topic = defaultdict(list)
+    for server_id, config in settings.items():
+        if 'topic_id' in config and 'notification_channel_id' in config:
+            channels_by_topic[config['topic_id']].append(config['notification_channel_id'])
+
+    followed = set()
+    for topic_id, channel_ids in channels_by_topic.items():
+        followed.update(reply_channel_key(topic_id, channel_id) for channel_id in channel_ids)
+
+        # Load current replies from file (updated by forum_monitor.py)
+        current_replies = load_forum_data(topic_id)
+        if not current_replies:
+            continue
+
+        # Check for new replies by comparing IDs
+        replies_by_id = {int(reply['id']): reply for reply in current_replies if reply.get('id') and str(reply.get('id')).isdigit()}
+        # A guild that starts following a topic is only told about replies posted from then on
+        topic_seen = last_seen_reply_ids.get(topic_id, set())
+        embeds_by_id = {}  # Rendered once per topic and shared by every guild following it
+        for channel_id in channel_ids:
+            key = reply_channel_key(topic_id, channel_id)
+            new_reply_ids = sorted(set(replies_by_id) - last_seen_reply_ids.get(key, topic_seen))
+            delivered = 0
+            if new_reply_ids:
+                for reply_id in new_reply_ids:
+                    if reply_id not in embeds_by_id:
+                        embeds_by_id[reply_id] = render_reply_embed(replies_by_id[reply_id])
+                delivered = await send_reply_embeds(channel_id, [embeds_by_id[reply_id] for reply_id in new_reply_ids])
+            # Replies that failed to send stay unseen for this channel and are retried on the next pass
+            last_seen_reply_ids[key] = set(replies_by_id) - set(new_reply_ids[delivered:])
+
+        last_seen_reply_ids[topic_id] = set(replies_by_id)
+
+    # Forget channels that no longer follow the topic they were tracked for
+    for key in [key for key in last_seen_reply_ids if ":" in str(key) and key not in followed]:
+        del last_seen_reply_ids[key]
+
 async def monitor_replies():
     """Monitor forum replies and send notifications based on files updated by forum_monitor.py."""
     # Track last seen reply IDs per topic to avoid duplicate notifications
@@ -1060,38 +2025,15 @@ async def monitor_replies():
     last_seen_reply_ids = load_last_seen()
     
     while True:
+        # Hold notifications while the gateway is down, forum_monitor keeps collecting
+        await bot.gateway_connected.wait()
         try:
             settings = load_config()
             if not settings:
                 await asyncio.sleep(60)
                 continue
 
-            for server_id, config in settings.items():
-                if 'topic_id' in config and 'notification_channel_id' in config:
-                    topic_id = config['topic_id']
-                    channel_id = config['notification_channel_id']
-                    
-                    # Initialize tracking for this topic
-                    if topic_id not in last_seen_reply_ids:
-                        last_seen_reply_ids[topic_id] = set()
-                    
-                    # Load current replies from file (updated by forum_monitor.py)
-                    current_replies = load_forum_data(topic_id)
-                    if not current_replies:
-                        continue
-                    
-                    # Check for new replies by comparing IDs
-                    current_reply_ids = {int(reply.get('id')) for reply in current_replies if reply.get('id') and str(reply.get('id')).isdigit()}
-                    new_reply_ids = current_reply_ids - last_seen_reply_ids[topic_id]
-                    
-                    # Send notifications for new replies
-                    for reply in current_replies:
-                        reply_id = reply.get('id')
-                        if reply_id and str(reply_id).isdigit() and int(reply_id) in new_reply_ids:
-                            await send_notification(reply, channel_id)
-                    
-                    # Update tracking
-                    last_seen_reply_ids[topic_id] = current_reply_ids
+            await run_replies_pass(settings, last_seen_reply_ids)
             
             # Save the updated tracking to file
             save_last_seen(last_seen_reply_ids)
@@ -1101,12 +2043,8 @@ async def monitor_replies():
             logger.error(f"Error in monitor_replies: {e}")
             await asyncio.sleep(60)  # Wait before retrying
 
-async def send_notification(new_reply, channel_id):
-    """Send a notification to the specified channel when a new reply is detected."""
-    channel = bot.get_channel(int(channel_id))
-    if not channel:
-        return
-    
+def render_reply_embed(new_reply):
+    """Build the notification embed for one forum reply."""
     content, media_message = clean_html(new_reply.get("content", "No content available."))
     date_str = format_date(new_reply.get("date", "Unknown date"))
 
@@ -1130,113 +2068,67 @@ async def send_notification(new_reply, channel_id):
     embed.add_field(name="Content", value=content, inline=False)
     embed.add_field(name="Date", value=str(date_str)[:256], inline=False)
     embed.add_field(name="Link", value=link, inline=False)
-
-    await channel.send(embed=embed)
-
-process = None
-forum_process = None  # RE-ENABLED - using separate forum_monitor.py for better architecture
-
-async def update_player_list_and_forum_comments():
-    """Update player list and forum comments periodically."""
-    global process
-    global forum_process  # RE-ENABLED - using separate forum_monitor.py for better architecture
-    
-    while True:
+    return embed
+
+def batch_embeds(embeds):
+    """Group embeds into messages within Discord's limits of 10 embeds and 6000 characters."""
+    batches = []
+    current = []
+    size = 0
+    for embed in embeds:
+        if current and (len(current) == MAX_EMBEDS_PER_MESSAGE or size + len(embed) > MAX_EMBED_CHARS_PER_MESSAGE):
+            batches.append(current)
+            current, size = [], 0
+        current.append(embed)
+        size += len(embed)
+    if current:
+        batches.append(current)
+    return batches
+
+async def send_reply_embeds(channel_id, embeds):
+    """Send reply notifications to a channel, up to 10 embeds per message; returns how many leading embeds were handled."""
+    channel = bot.get_channel(int(channel_id))
+    if not channel:
+        return len(embeds)  # Channel gone or inaccessible, retrying won't help
+    delivered = 0
+    for batch in batch_embeds(embeds):
         try:
-            # Check and manage setup_db process
-            if process is None or process.poll() is not None:
-                # Clean up the old process if it exists
-                if process is not None:
-                    try:
-                        process.terminate()
-                        process.wait(timeout=5)
-                    except:
-                        pass
-                
-                # Kill any existing setup_db processes to prevent duplicates
-                try:
-                    subprocess.run(['pkill', '-f', 'setup_db.py'], capture_output=True, timeout=10)
-                    await asyncio.sleep(2)  # Wait for cleanup
-                except:
-                    pass
-                
-                # Start new process
-                logger.info("Starting setup_db.py process")
-                process = subprocess.Popen(['/opt/lsrp/venv/bin/python', 'setup_db.py'])
-            
-            # Check and manage forum_monitor process
-            if forum_process is None or forum_process.poll() is not None:
-                # Clean up the old process if it exists
-                if forum_process is not None:
-                    try:
-                        forum_process.terminate()
-                        forum_process.wait(timeout=5)
-                    except:
-                        pass
-                
-                # Kill any existing forum_monitor processes to prevent duplicates
-                try:
-                    subprocess.run(['pkill', '-f', 'forum_monitor.py'], capture_output=True, timeout=10)
-                    await asyncio.sleep(2)  # Wait for cleanup
-                except:
-                    pass
-                
-                # Start new process
-                logger.info("Starting forum_monitor.py process")
-                forum_process = subprocess.Popen(['/opt/lsrp/venv/bin/python', 'forum_monitor.py'])
-            
-            await asyncio.sleep(300)  # Keep 5-minute check interval
-            
-        except Exception as e:
-            logger.error(f"Error in update_player_list_and_forum_comments: {e}")
-            await asyncio.sleep(60)  # Wait a minute before retrying on error
+            await channel.send(embeds=batch)
+            MESSAGES_SENT.inc(route="forum_notification")
+        except discord.HTTPException as e:
+            # Stop at the first failure so the rest are retried in order on the next pass
+            logger.error(f"Error sending forum notification to channel {channel_id}: {e}")
+            break
+        delivered += len(batch)
+    return delivered
+
+# setup_db.py and forum_monitor.py run as supervised child processes
+scraper_supervisor = ProcessSupervisor(['setup_db.py', 'forum_monitor.py'])
 
 async def cleanup_processes():
     """Clean up subprocess when bot shuts down."""
-    global process, forum_process
-    
     logger.info("Cleaning up processes...")
-    
-    # Clean up setup_db process
-    if process is not None:
-        try:
-            process.terminate()
-            process.wait(timeout=5)
-            logger.info("setup_db.py process terminated")
-        except:
-            try:
-                process.kill()
-                logger.info("setup_db.py process killed")
-            except:
-                pass
-    
-    # Clean up forum_monitor process
-    if forum_process is not None:
-        try:
-            forum_process.terminate()
-            forum_process.wait(timeout=5)
-            logger.info("forum_monitor.py process terminated")
-        except:
-            try:
-                forum_process.kill()
-                logger.info("forum_monitor.py process killed")
-            except:
-                pass
+    await scraper_supervisor.stop()
 
 @bot.event
 async def on_disconnect():
-    """Handle bot disconnect."""
-    logger.info("Bot disconnected")
-    await cleanup_processes()
-
-# Run the bot
-try:
-    bot.run(DISCORD_TOKEN)
-except KeyboardInterrupt:
-    logger.info("Bot stopped by user")
-    asyncio.run(cleanup_processes())
-except Exception as e:
-    logger.error(f"Bot crashed: {e}")
-    asyncio.run(cleanup_processes())
-finally:
-    asyncio.run(cleanup_processes())
\ No newline at end of file
+    """Pause Discord dispatch; discord.py reconnects on its own and the scrapers keep running."""
+    logger.info("Bot disconnected, pausing notifications until the gateway is back")
+    bot.gateway_connected.clear()
+
+@bot.event
+async def on_resumed():
+    logger.info("Gateway session resumed, notifications re-enabled")
+    bot.gateway_connected.set()
+
+# Run the bot; importing the module (bench/) only builds it
+if __name__ == "__main__":
+    try:
+        bot.run(DISCORD_TOKEN)
+    except KeyboardInterrupt:
+        logger.info("Bot stopped by user")
+    except Exception as e:
+        logger.error(f"Bot crashed: {e}")
+    finally:
+        # The event loop is closed by now, signal any remaining children directly
+        scraper_supervisor.kill()
\ No newline at end of file
@@ -4,8 +4,8 @@ import json
 import time
 from dotenv import load_dotenv
 import asyncio
-from bs4 import BeautifulSoup
 from datetime import datetime
+import metrics
 
 load_dotenv()  # Load environment variables from .env file
 
@@ -14,10 +14,19 @@ DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 API_KEY = os.getenv('API_KEY')
 
 # Constants
-API_URL = "https://community.ls-rp.com/api/forums/topics/{}/posts"  # Base URL with a placeholder for topic ID
+FORUM_API_BASE = os.getenv('FORUM_API_BASE', 'https://community.ls-rp.com')  # Point at bench/standin.py for load tests
+API_URL = f"{FORUM_API_BASE}/api/forums/topics/{{}}/posts"  # Base URL with a placeholder for topic ID
 FORUMS = 749      # Forums parameter (fixed)
 PER_PAGE = 15     # Number of replies per page (fixed)
 
+FORUM_REQUESTS = metrics.counter('lsrp_forum_requests_total', 'Forum API requests by response status')
+FORUM_REQUEST_DURATION = metrics.histogram('lsrp_forum_request_duration_seconds', 'Forum API request latency')
+FORUM_PAGES = metrics.gauge('lsrp_forum_pages_fetched', 'Forum pages fetched in the last cycle')
+FORUM_TOPICS = metrics.gauge('lsrp_forum_topics', 'Topics checked in the last cycle by result')
+FORUM_CYCLE_DURATION = metrics.histogram('lsrp_forum_cycle_duration_seconds', 'Time to check every configured topic')
+FORUM_LAST_SUCCESS = metrics.gauge('lsrp_forum_last_success_timestamp_seconds', 'Unix time of the last cycle with a successful topic')
+pages_this_cycle = 0
+
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_FILE = os.path.join(SCRIPT_DIR, 'bot_config.json')
@@ -58,6 +67,22 @@ def format_date(date_str):
     dt = datetime.fromisoformat(date_str[:-1])  # Remove the 'Z' and convert
     return dt.strftime("%B %d, %Y at %I:%M %p")  # Format date
 
+def get_page(url, headers, params):
+    """GET one page of the forum API, counting the request and its status."""
+    global pages_this_cycle
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, headers=headers, params=params, timeout=30)
+    except requests.exceptions.RequestException as e:
+        FORUM_REQUESTS.inc(status=type(e).__name__)
+        raise
+    finally:
+        FORUM_REQUEST_DURATION.observe(time.perf_counter() - start)
+    FORUM_REQUESTS.inc(status=response.status_code)
+    if response.status_code == 200:
+        pages_this_cycle += 1
+    return response
+
 def fetch_total_pages(topic_id, forums):
     """Fetch the total number of pages for a topic."""
     url = API_URL.format(topic_id)
@@ -72,7 +97,7 @@ def fetch_total_pages(topic_id, forums):
     }
     
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = get_page(url, headers, params)
         
         if response.status_code == 200:
             data = response.json()
@@ -108,7 +133,7 @@ def fetch_forum_replies(topic_id, forums, page):
     }
     
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = get_page(url, headers, params)
         
         if response.status_code == 200:
             data = response.json()
@@ -177,6 +202,7 @@ async def monitor_single_topic(topic_id):
 
 async def monitor_forum():
     """Monitor forum for new replies across all configured topics."""
+    global pages_this_cycle
     consecutive_errors = 0
     max_consecutive_errors = 10  # Increased since we're monitoring multiple topics
     
@@ -194,6 +220,8 @@ async def monitor_forum():
             
             successful_topics = 0
             failed_topics = 0
+            pages_this_cycle = 0
+            cycle_start = time.perf_counter()
             
             # Monitor each topic
             for topic_id in topic_ids:
@@ -206,6 +234,12 @@ async def monitor_forum():
                 # Add delay between topics to prevent rate limiting
                 await asyncio.sleep(2)
             
+            FORUM_CYCLE_DURATION.observe(time.perf_counter() - cycle_start)
+            FORUM_PAGES.set(pages_this_cycle)
+            FORUM_TOPICS.set(successful_topics, result="ok")
+            FORUM_TOPICS.set(failed_topics, result="failed")
+            if successful_topics:
+                FORUM_LAST_SUCCESS.set(time.time())
             print(f"\n--- Forum check complete ---")
             print(f"✅ Successful: {successful_topics} topics")
             print(f"❌ Failed: {failed_topics} topics")
@@ -237,4 +271,5 @@ async def monitor_forum():
                 await asyncio.sleep(60)  # Wait a minute before retrying
 
 if __name__ == "__main__":
+    metrics.start_http_server('METRICS_PORT_FORUM')
     asyncio.run(monitor_forum())
\ No newline at end of file
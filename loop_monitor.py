@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+
+SAMPLE_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', '0.25'))  # Seconds between loop heartbeats
+STACK_THRESHOLD = float(os.getenv('LOOP_LAG_THRESHOLD', '0.25'))  # Lag that triggers a stack capture
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
+
+def _location(frame_summary):
+    filename = frame_summary.filename
+    if filename.startswith(PROJECT_DIR):
+        filename = os.path.relpath(filename, PROJECT_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{frame_summary.lineno} in {frame_summary.name}"
+
+class LoopLagMonitor:
+    """Sample event loop lag and capture the stack of whatever is blocking the loop."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, threshold=STACK_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.offenders = {}  # Location -> {"count", "total", "max", "stack"}
+        self._lock = threading.Lock()
+        self._loop_thread_id = None
+        self._last_tick = None
+        self._pending_capture = None  # Stack captured during the current stall
+        self._stop = threading.Event()
+
+    async def run(self):
+        """Heartbeat coroutine, run it as a background task on the loop being watched."""
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        watcher = threading.Thread(target=self._watch, name='loop-lag-watchdog', daemon=True)
+        watcher.start()
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                self._last_tick = time.monotonic()
+                await asyncio.sleep(self.interval)
+                self.observe(max(0.0, loop.time() - expected))
+        finally:
+            self._stop.set()
+
+    def observe(self, lag):
+        """Record one lag sample and attribute it to the stack captured during the stall."""
+        with self._lock:
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            for index, bound in enumerate(BUCKETS):
+                if lag <= bound:
+                    self.bucket_counts[index] += 1
+                    break
+            capture, self._pending_capture = self._pending_capture, None
+
+        if capture is None:
+            return
+        location, stack = capture
+        with self._lock:
+            offender = self.offenders.setdefault(location, {"count": 0, "total": 0.0, "max": 0.0, "stack": stack})
+            offender["count"] += 1
+            offender["total"] += lag
+            if lag >= offender["max"]:
+                offender["max"] = lag
+                offender["stack"] = stack
+        logger.warning(f"Event loop blocked for {lag:.2f}s at {location}")
+
+    def _watch(self):
+        """Watchdog thread: grab the loop thread's stack while it is still blocked."""
+        while not self._stop.wait(self.threshold / 2):
+            if self._last_tick is None or self._pending_capture is not None:
+                continue
+            stalled = time.monotonic() - self._last_tick - self.interval
+            if stalled < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            # Blame the innermost frame from our own code, the blocking call sits below it
+            project_frames = [summary for summary in stack if summary.filename.startswith(PROJECT_DIR) and not summary.filename.endswith('loop_monitor.py')]
+            culprit = project_frames[-1] if project_frames else stack[-1]
+            location = _location(culprit)
+            if culprit is not stack[-1]:
+                location += f" -> {_location(stack[-1])}"
+            self._pending_capture = (location, "".join(traceback.format_list(stack[-8:])))
+
+    def percentile(self, fraction):
+        """Upper bucket bound below which `fraction` of the samples fall."""
+        with self._lock:
+            target = self.samples * fraction
+            seen = 0
+            for bound, count in zip(BUCKETS, self.bucket_counts):
+                seen += count
+                if seen >= target and count:
+                    return bound
+        return 0.0
+
+    def histogram(self):
+        with self._lock:
+            return list(zip(BUCKETS, self.bucket_counts))
+
+    def worst_offenders(self, limit=5):
+        with self._lock:
+            ranked = sorted(self.offenders.items(), key=lambda item: item[1]["total"], reverse=True)
+            return [(location, dict(stats)) for location, stats in ranked[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self.bucket_counts = [0] * len(BUCKETS)
+            self.samples = 0
+            self.total_lag = 0.0
+            self.max_lag = 0.0
+            self.offenders.clear()
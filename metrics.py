@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Every process exposes its own registry on localhost; set the port variable
+# (METRICS_PORT_BOT, METRICS_PORT_SCRAPER, METRICS_PORT_FORUM) to enable it
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger(__name__)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base class: a named family of samples keyed by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name, help_text, function=None):
+        self.name = name
+        self.help_text = help_text
+        self.function = function  # Computes the value at scrape time instead of storing it
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def samples(self):
+        if self.function is not None:
+            value = self.function()
+            return [] if value is None else [(self.name, (), value)]
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in sorted(self.values.items())]
+
+    def render(self):
+        try:
+            samples = self.samples()
+        except Exception as e:
+            logger.warning(f"Could not collect metric {self.name}: {e}")
+            samples = []
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{format_labels(labels)} {format_value(value)}" for name, labels, value in samples)
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.values[_label_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block."""
+        histogram = self
+
+        class _Timer:
+            def __enter__(self):
+                self.start = time.perf_counter()
+                return self
+
+            def __exit__(self, *exc_info):
+                histogram.observe(time.perf_counter() - self.start, **labels)
+
+        return _Timer()
+
+    def samples(self):
+        rows = []
+        with self._lock:
+            for labels, (counts, total) in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    rows.append((f"{self.name}_bucket", labels + (("le", format_value(bound)),), count))
+                rows.append((f"{self.name}_sum", labels, total))
+                rows.append((f"{self.name}_count", labels, counts[-1]))
+        return rows
+
+class Registry:
+    """Metrics of one process, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []  # Callables returning extra exposition text at scrape time
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, function=None):
+        return self._register(Counter(name, help_text, function))
+
+    def gauge(self, name, help_text, function=None):
+        return self._register(Gauge(name, help_text, function))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self.metrics.values())
+        parts = [metric.render() for metric in metrics]
+        for collector in self.collectors:
+            try:
+                parts.append(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector} failed: {e}")
+        return "\n".join(parts) + "\n"
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would drown the real logs
+
+def start_http_server(port_variable):
+    """Serve /metrics in a daemon thread if the port environment variable is set."""
+    port = os.getenv(port_variable)
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((METRICS_HOST, int(port)), _MetricsHandler)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not start metrics endpoint on {METRICS_HOST}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"Serving metrics on http://{METRICS_HOST}:{port}/metrics")
+    return server
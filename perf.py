@@ -0,0 +1,154 @@
+import time
+import inspect
+import functools
+import contextvars
+from collections import defaultdict, deque
+
+HISTOGRAM_WINDOW = 500  # Most recent samples kept per histogram
+PHASES = ("check", "defer", "load", "send", "total")
+STALE_TIMER_AGE = 900  # Seconds after which an unfinished timer is discarded
+
+# Timer of the app command running in the current task; discord.py runs every
+# interaction in its own task, so loaders can find it without extra arguments
+current_timer = contextvars.ContextVar('current_command_timer', default=None)
+
+class RollingHistogram:
+    """Keep the last HISTOGRAM_WINDOW samples and compute percentiles on demand."""
+
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self.samples = deque(maxlen=window)
+
+    def add(self, value):
+        self.samples.append(value)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def percentiles(self, *fractions):
+        if not self.samples:
+            return [0.0 for _ in fractions]
+        ordered = sorted(self.samples)
+        return [ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] for fraction in fractions]
+
+class CommandTimer:
+    """Phase timings of a single app command invocation."""
+
+    def __init__(self, command, guild_id):
+        self.command = command
+        self.guild_id = guild_id
+        self.started = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.last_phase_end = self.started
+        self.in_phase = False  # Nested timed calls count towards the outer phase only
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+        self.last_phase_end = time.perf_counter()
+
+class CommandStats:
+    """Rolling latency histograms per command and per guild."""
+
+    def __init__(self):
+        self.by_command = defaultdict(lambda: {phase: RollingHistogram() for phase in PHASES})
+        self.by_guild = defaultdict(RollingHistogram)
+        self.calls = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.expired = defaultdict(int)
+        self._timers = {}  # Interaction id -> CommandTimer
+
+    def begin(self, interaction):
+        """Start timing an interaction, called before any check runs."""
+        command = interaction.command.qualified_name if interaction.command else "unknown"
+        timer = CommandTimer(command, interaction.guild_id)
+        # Drop timers of interactions that never reported back
+        cutoff = timer.started - STALE_TIMER_AGE
+        for interaction_id in [key for key, other in self._timers.items() if other.started < cutoff]:
+            del self._timers[interaction_id]
+        self._timers[interaction.id] = timer
+        current_timer.set(timer)
+        return timer
+
+    def timer_for(self, interaction=None):
+        if interaction is not None and interaction.id in self._timers:
+            return self._timers[interaction.id]
+        return current_timer.get()
+
+    def mark_deferred(self, interaction):
+        """Record the time from receiving the interaction to a successful defer()."""
+        timer = self.timer_for(interaction)
+        if timer is not None and "defer" not in timer.phases:
+            timer.add("defer", time.perf_counter() - timer.started)
+
+    def record_expired(self, interaction):
+        """Count an interaction that expired before we could respond."""
+        timer = self.timer_for(interaction)
+        if timer is not None:
+            self.expired[timer.command] += 1
+        else:
+            self.expired[interaction.command.qualified_name if interaction.command else "unknown"] += 1
+
+    def finish(self, interaction, error=False):
+        """Close the timer of an interaction and feed the histograms."""
+        timer = self._timers.pop(interaction.id, None)
+        if timer is None:
+            return
+        now = time.perf_counter()
+        histograms = self.by_command[timer.command]
+        for phase in ("check", "defer", "load"):
+            if phase in timer.phases:
+                histograms[phase].add(timer.phases[phase])
+        histograms["send"].add(now - timer.last_phase_end)
+        histograms["total"].add(now - timer.started)
+        if timer.guild_id is not None:
+            self.by_guild[timer.guild_id].add(now - timer.started)
+        self.calls[timer.command] += 1
+        if error:
+            self.errors[timer.command] += 1
+
+    def timed(self, phase):
+        """Decorator adding a function's run time to `phase` of the current command, if any."""
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    timer = current_timer.get()
+                    if timer is None or timer.in_phase:
+                        return await func(*args, **kwargs)
+                    timer.in_phase = True
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        timer.in_phase = False
+                        timer.add(phase, time.perf_counter() - start)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                timer = current_timer.get()
+                if timer is None or timer.in_phase:
+                    return func(*args, **kwargs)
+                timer.in_phase = True
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    timer.in_phase = False
+                    timer.add(phase, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def command_summary(self):
+        """Rows of (command, calls, errors, expired, {phase: (p50, p95, p99)}), slowest p95 first."""
+        rows = []
+        for command, histograms in self.by_command.items():
+            phases = {phase: tuple(histogram.percentiles(0.5, 0.95, 0.99)) for phase, histogram in histograms.items() if len(histogram)}
+            rows.append((command, self.calls[command], self.errors[command], self.expired[command], phases))
+        rows.sort(key=lambda row: row[4].get("total", (0, 0, 0))[1], reverse=True)
+        return rows
+
+    def guild_summary(self, limit=5):
+        """Guilds with the slowest p95 total latency."""
+        rows = [(guild_id, len(histogram), *histogram.percentiles(0.5, 0.95, 0.99)) for guild_id, histogram in self.by_guild.items()]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows[:limit]
@@ -0,0 +1,134 @@
+import os
+import time
+import struct
+from array import array
+
+from snapshot import FLAGS
+
+# Online player counts over time, written by setup_db.py and read by the bot's /population.
+#
+# Every snapshot is added to each tier; a tier is a ring of fixed-size slots
+# indexed by (timestamp // resolution) % capacity holding the sample count, the
+# sum and the peak of every series. A slot from an older lap of the ring is
+# reset when reused, so memory and file size never grow.
+
+MAGIC = b'LSPH'
+FORMAT_VERSION = 1
+SERIES = ("players",) + tuple(flag for flag in FLAGS if flag != "hideAccountName")
+TIERS = (
+    (60, 24 * 60),  # One-minute slots (about one per UCP sync) for 24 hours
+    (15 * 60, 30 * 24 * 4),  # 15-minute buckets for 30 days
+    (3600, 365 * 24),  # Hourly buckets for a year
+)
+HEADER = struct.Struct('<4sHHH')
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+class Tier:
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.slots = array('q', [-1]) * capacity  # Slot number held by each position, -1 when empty
+        self.samples = array('I', [0]) * capacity
+        self.sums = array('d', [0.0]) * (capacity * len(SERIES))
+        self.peaks = array('d', [0.0]) * (capacity * len(SERIES))
+
+    @property
+    def span(self):
+        return self.resolution * self.capacity
+
+    def arrays(self):
+        return (self.slots, self.samples, self.sums, self.peaks)
+
+    def add(self, timestamp, values):
+        slot = int(timestamp // self.resolution)
+        position = slot % self.capacity
+        base = position * len(SERIES)
+        if self.slots[position] != slot:
+            self.slots[position] = slot
+            self.samples[position] = 0
+            for column in range(len(SERIES)):
+                self.sums[base + column] = 0.0
+                self.peaks[base + column] = 0.0
+        self.samples[position] += 1
+        for column, value in enumerate(values):
+            self.sums[base + column] += value
+            self.peaks[base + column] = max(self.peaks[base + column], value)
+
+    def points(self, start, end, column):
+        """(slot start time, average, peak) of one series for every slot in [start, end], None where empty."""
+        points = []
+        first = max(int(start // self.resolution), int(end // self.resolution) - self.capacity + 1)
+        for slot in range(first, int(end // self.resolution) + 1):
+            position = slot % self.capacity
+            if self.slots[position] != slot:
+                points.append((slot * self.resolution, None, None))
+                continue
+            index = position * len(SERIES) + column
+            points.append((slot * self.resolution, self.sums[index] / self.samples[position], self.peaks[index]))
+        return points
+
+class PopulationHistory:
+    """Multi-resolution ring buffers of per-flag online counts."""
+
+    def __init__(self):
+        self.tiers = [Tier(resolution, capacity) for resolution, capacity in TIERS]
+        self.saved = 0.0
+
+    def record(self, timestamp, players):
+        """Add one snapshot's player list."""
+        values = [len(players)] + [0] * (len(SERIES) - 1)
+        for player in players:
+            for column, flag in enumerate(SERIES[1:], 1):
+                if player.get(flag):
+                    values[column] += 1
+        for tier in self.tiers:
+            tier.add(timestamp, values)
+
+    def query(self, seconds, series="players", now=None):
+        """Points of the finest tier that covers the last `seconds`, with that tier's resolution."""
+        now = time.time() if now is None else now
+        tier = next((tier for tier in self.tiers if tier.span >= seconds), self.tiers[-1])
+        return tier.resolution, tier.points(now - seconds, now, SERIES.index(series))
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(SERIES), len(self.tiers)))
+            for tier in self.tiers:
+                for values in tier.arrays():
+                    values.tofile(f)
+        os.replace(tmp_path, path)
+        self.saved = time.monotonic()
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved history; a missing or incompatible file gives an empty one."""
+        history = cls()
+        try:
+            with open(path, 'rb') as f:
+                magic, version, series, tiers = HEADER.unpack(f.read(HEADER.size))
+                if (magic, version, series, tiers) != (MAGIC, FORMAT_VERSION, len(SERIES), len(TIERS)):
+                    return history
+                for tier in history.tiers:
+                    for values in tier.arrays():
+                        count = len(values)
+                        del values[:]
+                        values.fromfile(f, count)
+        except (FileNotFoundError, struct.error, EOFError):
+            return cls()
+        return history
+
+def sparkline(values, width):
+    """Squeeze values (None for gaps) into `width` block characters scaled to the largest value."""
+    if not values:
+        return ""
+    width = min(width, len(values))
+    columns = []
+    for column in range(width):
+        chunk = [value for value in values[column * len(values) // width:(column + 1) * len(values) // width] if value is not None]
+        columns.append(sum(chunk) / len(chunk) if chunk else None)
+    top = max((value for value in columns if value is not None), default=0)
+    return "".join(
+        " " if value is None else SPARK_CHARS[min(len(SPARK_CHARS) - 1, int(value / top * len(SPARK_CHARS))) if top else 0]
+        for value in columns
+    )
@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+PROFILE_DIR = os.path.join('data', 'profiles')
+MAX_PROFILE_SECONDS = 600
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples in sampling mode
+TRACEMALLOC_FRAMES = 25
+MODES = ("cprofile", "sampling")
+
+class StackSampler:
+    """Periodically sample one thread's stack and count collapsed stacks for flamegraphs."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+class ProfileSession:
+    """One bounded profiling window: cProfile or stack sampling, plus tracemalloc."""
+
+    def __init__(self, mode, seconds):
+        self.mode = mode
+        self.seconds = seconds
+        self.started_at = None
+        self.name = datetime.now().strftime('%Y%m%d-%H%M%S') + f'-{mode}'
+        self._profiler = None
+        self._sampler = None
+        self._started_tracemalloc = False
+        self._snapshot_before = None
+
+    def start(self):
+        """Start profiling the calling thread, which should be the event loop thread; call take_baseline afterwards."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+        self.started_at = time.monotonic()
+
+    def take_baseline(self):
+        """Snapshot allocations at the start of the window, meant for a worker thread.
+
+        The snapshot copies every trace while holding the GIL, so with a large heap
+        the event loop still pauses for part of it.
+        """
+        self._snapshot_before = tracemalloc.take_snapshot()
+
+    def stop(self):
+        """Stop collecting; call write_reports afterwards in a worker thread, it takes the final snapshot."""
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.elapsed = time.monotonic() - self.started_at
+
+    def write_reports(self, top=10):
+        """Write the reports to PROFILE_DIR and return a short text summary."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, self.name)
+        lines = [f"Profiled for {self.elapsed:.1f}s ({self.mode})"]
+        self._snapshot_after = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        if self._profiler is not None:
+            self._profiler.dump_stats(base + '.pstats')
+            stats = pstats.Stats(self._profiler)
+            lines.append(f"Top functions by cumulative time ({base}.pstats):")
+            for func, (calls, _, total_time, cumulative, _) in sorted(
+                stats.stats.items(), key=lambda item: item[1][3], reverse=True
+            )[:top]:
+                filename, lineno, name = func
+                lines.append(f"  {cumulative:7.3f}s {total_time:7.3f}s {calls:>7} {os.path.basename(filename)}:{lineno}({name})")
+        else:
+            with open(base + '.collapsed', 'w') as f:
+                for stack, count in self._sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            leaves = Counter()
+            for stack, count in self._sampler.stacks.items():
+                leaves[stack.rsplit(';', 1)[-1]] += count
+            lines.append(f"{self._sampler.samples} samples, top leaf functions ({base}.collapsed):")
+            for leaf, count in leaves.most_common(top):
+                lines.append(f"  {count / max(self._sampler.samples, 1):6.1%} {leaf}")
+
+        differences = self._snapshot_after.compare_to(self._snapshot_before, 'lineno')
+        with open(base + '.alloc.txt', 'w') as f:
+            for stat in differences[:100]:
+                f.write(f"{stat}\n")
+        lines.append(f"Top allocation growth ({base}.alloc.txt):")
+        for stat in differences[:5]:
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7} blocks {os.path.basename(frame.filename)}:{frame.lineno}")
+        return "\n".join(lines)
@@ -0,0 +1,49 @@
+import asyncio
+from collections import OrderedDict
+
+RESPONSE_CACHE_SIZE = 256  # Rendered responses kept across commands, arguments and data versions
+
+class ResponseCache:
+    """LRU of rendered command responses keyed by (command, args, data version).
+
+    Entries hold the rendering task, so callers arriving while it runs share it.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # Key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, key, render):
+        """Return (response, result) where result is "hit", "miss" or "coalesced"; `render` is a coroutine function."""
+        task = self.entries.get(key)
+        if task is not None:
+            self.entries.move_to_end(key)
+            if task.done():
+                self.hits += 1
+                outcome = "hit"
+            else:
+                self.coalesced += 1
+                outcome = "coalesced"
+        else:
+            self.misses += 1
+            outcome = "miss"
+            task = asyncio.ensure_future(render())
+            task.add_done_callback(lambda done, key=key: self._forget_failure(key, done))
+            self.entries[key] = task
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        # Shielded so a caller whose interaction expires doesn't cancel the render for the others
+        return await asyncio.shield(task), outcome
+
+    def _forget_failure(self, key, task):
+        if (task.cancelled() or task.exception() is not None) and self.entries.get(key) is task:
+            del self.entries[key]
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,18 +1,28 @@
+import startup_profile
+startup_profile.install()
 import time
 import json
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+import hashlib
 import os
+import signal
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
 import asyncio
-import threading
-from selenium.common.exceptions import NoSuchWindowException, WebDriverException
+from snapshot import write_snapshot, update_sync_time
+from population import PopulationHistory
+from collections import deque
+import metrics
+
+# selenium and undetected_chromedriver dominate import time, they are loaded
+# by load_browser_modules() right before the browser is needed
+uc = By = WebDriverWait = EC = Keys = None
+NoSuchWindowException = WebDriverException = None
+
+try:
+    import psutil
+except ImportError:  # The Chrome resource watchdog is disabled without psutil
+    psutil = None
 
 load_dotenv() # Load environment variables from .env file
 
@@ -20,14 +30,59 @@ UCP_USERNAME = os.getenv('UCP_USERNAME')
 UCP_PASSWORD = os.getenv('UCP_PASSWORD')
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 NOTIFICATION_CHANNEL_ID = 804688024704253986  # Your specified channel ID
-SESSION_REFRESH_INTERVAL = 24 * 60 * 60  # 24 hours in seconds
 MAX_LOGIN_RETRIES = 3  # Number of login attempts before a full restart
 RESTART_DELAY = 10  # Time in seconds before retrying after max login retries
 VERIFICATION_WAIT_TIME = 300  # 5 minutes to wait for email verification
-
-# Create an event loop for Discord notifications
-discord_loop = asyncio.new_event_loop()
-asyncio.set_event_loop(discord_loop)
+UCP_BASE_URL = os.getenv('UCP_BASE_URL', 'https://ucp.ls-rp.com')  # Point at bench/standin.py for load tests
+PLAYER_LIST_URL = f"{UCP_BASE_URL}/api/sa/player-list"
+# Browser profile and cookies survive restarts so we only log in when the session really expired
+CHROME_PROFILE_DIR = os.path.abspath(os.getenv('CHROME_PROFILE_DIR', 'data/chrome_profile'))
+COOKIE_FILE = 'data/ucp_cookies.json'
+# Chrome is recycled when its process tree crosses one of these limits
+CHROME_RSS_LIMIT_MB = int(os.getenv('CHROME_RSS_LIMIT_MB', '1500'))
+CHROME_CPU_LIMIT_PERCENT = float(os.getenv('CHROME_CPU_LIMIT_PERCENT', '80'))
+CHROME_CPU_STRIKES = 3  # Consecutive samples over the CPU limit before recycling
+PLAYER_LIST_FILE = 'data/player_list.json'
+LAST_SEEN_FILE = 'data/last_seen.json'
+HEARTBEAT_FILE = 'data/player_list_heartbeat.json'  # Tiny freshness record readers can poll cheaply
+BINARY_SNAPSHOT = os.getenv('BINARY_SNAPSHOT', '0') == '1'  # Also publish the mmap snapshot for the bot
+BINARY_SNAPSHOT_FILE = 'data/player_list.bin'
+DEFAULT_REFRESH_INTERVAL = 120  # Used until the upstream sync cadence has been learned
+SYNC_GRACE = 5  # Seconds after the expected upstream sync before fetching
+POPULATION_FILE = 'data/population.bin'  # Per-flag online counts over time, read by /population
+POPULATION_SAVE_INTERVAL = 300  # Seconds between saves of the population history
+
+last_sync_timestamp = None  # Epoch of the newest syncTime we published
+SCRAPE_DURATION = metrics.histogram('lsrp_scrape_duration_seconds', 'Player list scrape time by phase')
+SCRAPES = metrics.counter('lsrp_scrapes_total', 'Player list fetches by result')
+PLAYERS_ONLINE = metrics.gauge('lsrp_players_online', 'Players in the latest snapshot')
+CHROME_RECYCLES = metrics.counter('lsrp_chrome_recycles_total', 'Chrome restarts by the resource watchdog')
+metrics.gauge(
+    'lsrp_snapshot_age_seconds', 'Seconds since the syncTime of the latest published snapshot',
+    function=lambda: time.time() - last_sync_timestamp if last_sync_timestamp else None
+)
+
+def load_browser_modules():
+    """Import selenium and undetected_chromedriver on first use."""
+    global uc, By, WebDriverWait, EC, Keys, NoSuchWindowException, WebDriverException
+    if uc is not None:
+        return
+    import undetected_chromedriver as uc
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.keys import Keys
+    from selenium.common.exceptions import NoSuchWindowException, WebDriverException
+
+_discord_loop = None
+
+def get_discord_loop():
+    """Create the event loop for Discord notifications on first use."""
+    global _discord_loop
+    if _discord_loop is None:
+        _discord_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_discord_loop)
+    return _discord_loop
 
 async def send_discord_notification(message):
     """Send a notification to the specified Discord channel."""
@@ -52,7 +107,7 @@ def check_for_verification(driver):
             # Send immediate notification
             asyncio.run_coroutine_threadsafe(
                 send_discord_notification("⚠️ Email verification required! Please check your email and verify your account."),
-                discord_loop
+                get_discord_loop()
             )
             
             # Wait for verification to complete
@@ -60,21 +115,21 @@ def check_for_verification(driver):
             while time.time() - start_time < VERIFICATION_WAIT_TIME:
                 try:
                     # Check if we're redirected to the main page or if verification is complete
-                    if "ucp.ls-rp.com" in driver.current_url and "verification" not in driver.page_source.lower():
+                    if urlparse(UCP_BASE_URL).netloc in driver.current_url and "verification" not in driver.page_source.lower():
                         print("Verification appears to be complete.")
                         asyncio.run_coroutine_threadsafe(
                             send_discord_notification("✅ Email verification completed successfully!"),
-                            discord_loop
+                            get_discord_loop()
                         )
                         return True
-                except:
+                except Exception:
                     pass
                 time.sleep(5)
             
             print("Verification timeout reached.")
             asyncio.run_coroutine_threadsafe(
                 send_discord_notification("❌ Email verification timeout reached. Please verify manually."),
-                discord_loop
+                get_discord_loop()
             )
             return False
         return True
@@ -82,28 +137,132 @@ def check_for_verification(driver):
         print(f"Error checking verification: {e}")
         return False
 
-def login_ucp():
-    retries = 0  # Track login attempts
+def create_driver():
+    """Start Chrome with the persistent user-data directory."""
+    load_browser_modules()
+    # A killed Chrome leaves its profile lock behind, which makes the next start fail
+    for lock_name in ("SingletonLock", "SingletonSocket", "SingletonCookie"):
+        lock_path = os.path.join(CHROME_PROFILE_DIR, lock_name)
+        if os.path.lexists(lock_path):
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+
+    # Setup Chrome options
+    options = uc.ChromeOptions()
+    options.add_argument("--auto-open-devtools-for-tabs")
+    options.add_argument('--headless=new')  # Use new headless mode
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    options.binary_location = '/usr/bin/google-chrome'
+
+    os.makedirs(CHROME_PROFILE_DIR, exist_ok=True)
+    return uc.Chrome(options=options, user_data_dir=CHROME_PROFILE_DIR)
+
+_saved_cookies = None  # Last cookie set written to COOKIE_FILE
+
+def save_cookies(driver):
+    """Serialize the browser cookies so a lost or wiped profile can still resume the session."""
+    global _saved_cookies
+    try:
+        cookies = driver.get_cookies()
+    except Exception as e:
+        print(f"Could not read cookies from browser: {e}")
+        return
+    if not cookies or cookies == _saved_cookies:
+        return
+
+    os.makedirs(os.path.dirname(COOKIE_FILE), exist_ok=True)
+    tmp_file = COOKIE_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(cookies, f)
+    os.replace(tmp_file, COOKIE_FILE)
+    _saved_cookies = cookies
+
+def restore_cookies(driver):
+    """Load serialized cookies into the browser without navigating anywhere."""
+    global _saved_cookies
+    if not os.path.exists(COOKIE_FILE):
+        return
+    try:
+        with open(COOKIE_FILE, 'r') as f:
+            cookies = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Could not load saved cookies: {e}")
+        return
+
+    now = time.time()
+    restored = 0
+    for cookie in cookies:
+        if cookie.get('expiry') and cookie['expiry'] <= now:
+            continue  # Already expired, no point restoring it
+        params = {
+            'name': cookie['name'],
+            'value': cookie['value'],
+            'domain': cookie.get('domain'),
+            'path': cookie.get('path', '/'),
+            'secure': cookie.get('secure', False),
+            'httpOnly': cookie.get('httpOnly', False),
+        }
+        if cookie.get('sameSite'):
+            params['sameSite'] = cookie['sameSite']
+        if cookie.get('expiry'):
+            params['expires'] = cookie['expiry']
+        try:
+            driver.execute_cdp_cmd('Network.setCookie', params)
+            restored += 1
+        except Exception as e:
+            print(f"Could not restore cookie {cookie.get('name')}: {e}")
+    _saved_cookies = cookies
+    print(f"Restored {restored} saved cookies.")
+
+def session_is_valid(driver):
+    """Check the current session with a single request to the player list API."""
+    try:
+        driver.get(PLAYER_LIST_URL)
+        body_text = driver.find_element(By.TAG_NAME, 'body').text
+        data = json.loads(body_text)
+    except (json.JSONDecodeError, WebDriverException):
+        return False
+    return isinstance(data, dict) and "players" in data
+
+def start_session():
+    """Resume the persisted UCP session, falling back to a full login only when it is rejected."""
     driver = None
+    try:
+        driver = create_driver()
+        restore_cookies(driver)
+        if session_is_valid(driver):
+            print("Persisted UCP session is still valid, skipping login.")
+            save_cookies(driver)
+            return driver
+        print("Persisted UCP session is not valid, performing full login.")
+    except Exception as e:
+        print(f"Could not resume persisted session: {e}")
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            driver = None
+    return login_ucp(driver)
+
+def login_ucp(driver=None):
+    """Log in to the UCP, reusing the given browser for the first attempt if provided."""
+    retries = 0  # Track login attempts
     base_delay = 5  # Base delay in seconds
     
     while retries < MAX_LOGIN_RETRIES:
         try:
             print(f"Attempt {retries + 1} of {MAX_LOGIN_RETRIES} to log in.")
 
-            # Setup Chrome options
-            options = uc.ChromeOptions()
-            options.add_argument("--auto-open-devtools-for-tabs")
-            options.add_argument('--headless=new')  # Use new headless mode
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--window-size=1920,1080')
-            options.binary_location = '/usr/bin/google-chrome'
-
             # Create Chrome driver
-            driver = uc.Chrome(options=options)
-            driver.get("https://ucp.ls-rp.com/")
+            if driver is None:
+                driver = create_driver()
+            driver.get(f"{UCP_BASE_URL}/")
             print("Opened Chrome, waiting for page to load.")
             time.sleep(5)  # Allow page to fully load
 
@@ -130,11 +289,12 @@ def login_ucp():
                 raise ValueError("403 Forbidden: Login failed.")
             
             # Navigate to API page after login
-            driver.get("https://ucp.ls-rp.com/api/sa/player-list")
+            driver.get(PLAYER_LIST_URL)
             if "403 Forbidden" in driver.page_source:
                 raise ValueError("403 Forbidden: Access to player list API denied.")
 
             print("Login successful.")
+            save_cookies(driver)
             return driver
 
         except Exception as e:
@@ -148,8 +308,9 @@ def login_ucp():
             if driver:
                 try:
                     driver.quit()  # Close driver on failure
-                except:
+                except Exception:
                     pass  # Ignore errors during cleanup
+                driver = None
             
             time.sleep(delay)  # Wait with exponential backoff
 
@@ -158,130 +319,436 @@ def login_ucp():
     return None  # Indicate failure after max retries
 
 
+def write_json_atomic(path, data, **kwargs):
+    """Write JSON to a temp file and rename it so readers never see a partial file."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp_path, path)
+
+def snapshot_hash(players):
+    """Canonical hash of the player set, independent of ordering and syncTime."""
+    canonical = sorted(players, key=lambda player: player.get("characterName") or "")
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+class SnapshotState:
+    """What the writer last published, restored from disk after a restart."""
+
+    def __init__(self):
+        self.hash = None
+        self.names = set()
+        self.sync_time = None  # Latest syncTime at which `names` were confirmed online
+        heartbeat = {}
+        try:
+            with open(HEARTBEAT_FILE, 'r') as f:
+                heartbeat = json.load(f)
+            with open(PLAYER_LIST_FILE, 'r') as f:
+                players = json.load(f).get("players", [])
+        except (OSError, json.JSONDecodeError, AttributeError):
+            return
+        # Only trust the heartbeat if it still describes the file on disk
+        if heartbeat.get("hash") == snapshot_hash(players):
+            self.hash = heartbeat["hash"]
+            self.names = {p.get("characterName") for p in players if p.get("characterName")}
+            self.sync_time = heartbeat.get("syncTime")
+
+_snapshot_state = None
+_population = None
+_population_last_sync = None  # syncTime of the last recorded snapshot, repeated fetches are skipped
+
+def record_population(json_data):
+    """Add the snapshot's per-flag counts to the population history."""
+    global _population, _population_last_sync
+    if _population is None:
+        _population = PopulationHistory.load(POPULATION_FILE)
+    sync_ts = parse_sync_time(json_data.get("syncTime"))
+    if sync_ts is None or (_population_last_sync is not None and sync_ts <= _population_last_sync):
+        return
+    _population_last_sync = sync_ts
+    _population.record(sync_ts, json_data.get("players", []))
+    if time.monotonic() - _population.saved >= POPULATION_SAVE_INTERVAL:
+        _population.save(POPULATION_FILE)
+
+def save_population():
+    """Write out samples recorded since the last periodic save."""
+    if _population is None:
+        return
+    try:
+        _population.save(POPULATION_FILE)
+    except OSError as e:
+        print(f"Error saving population history: {e}")
+
+def handle_sigterm(signum, frame):
+    # The supervisor stops us with SIGTERM; unwind through the finally blocks like Ctrl+C would
+    raise SystemExit(0)
+
+def save_snapshot(json_data):
+    """Publish a fetched player list, skipping all downstream work when only syncTime moved."""
+    global _snapshot_state, last_sync_timestamp
+    if _snapshot_state is None:
+        _snapshot_state = SnapshotState()
+    state = _snapshot_state
+
+    os.makedirs('data', exist_ok=True)
+    sync_time = json_data.get("syncTime")
+    players = json_data.get("players", [])
+    players_hash = snapshot_hash(players)
+    heartbeat = {
+        "syncTime": sync_time,
+        "hash": players_hash,
+        "playerCount": len(players),
+        "changed": players_hash != state.hash,
+    }
+    last_sync_timestamp = parse_sync_time(sync_time) or last_sync_timestamp
+    PLAYERS_ONLINE.set(len(players))
+    record_population(json_data)
+
+    if players_hash == state.hash:
+        if BINARY_SNAPSHOT and not update_sync_time(BINARY_SNAPSHOT_FILE, sync_time):
+            write_snapshot(BINARY_SNAPSHOT_FILE, json_data, players_hash)
+        write_json_atomic(HEARTBEAT_FILE, heartbeat)
+        state.sync_time = sync_time
+        print(f"Player set unchanged ({players_hash[:12]}), heartbeat updated for {sync_time}")
+        return False
+
+    # Save the parsed JSON data to a file
+    write_json_atomic(PLAYER_LIST_FILE, json_data, separators=(',', ':'))
+    print(f"Player list data saved to {PLAYER_LIST_FILE}")
+    if BINARY_SNAPSHOT:
+        write_snapshot(BINARY_SNAPSHOT_FILE, json_data, players_hash)
+
+    # Load existing last_seen data if it exists
+    if os.path.exists(LAST_SEEN_FILE):
+        with open(LAST_SEEN_FILE, 'r') as f:
+            last_seen_dict = json.load(f)
+    else:
+        last_seen_dict = {}  # Initialize an empty dictionary if the file doesn't exist
+
+    # Players who just left were last seen at the final heartbeat that still listed them
+    names = {p.get("characterName") for p in players if p.get("characterName")}
+    if state.sync_time:
+        for character_name in state.names - names:
+            last_seen_dict[character_name] = state.sync_time
+
+    # Update or add character names in last_seen_dict
+    for character_name in names:
+        last_seen_dict[character_name] = sync_time  # Update or add the entry
+
+    # Save updated last_seen data back to the JSON file
+    write_json_atomic(LAST_SEEN_FILE, last_seen_dict, indent=4)
+    print(f"Last seen data saved to {LAST_SEEN_FILE}")
+
+    # Heartbeat goes last so readers only see the new hash once the snapshot is in place
+    write_json_atomic(HEARTBEAT_FILE, heartbeat)
+    state.hash = players_hash
+    state.names = names
+    state.sync_time = sync_time
+    return True
+
 def fetch_and_save_json_data(driver):
+    """Parse the player list page and save it. Returns the parsed data, or None on failure."""
     time.sleep(5)
 
     # Fetch body text containing JSON data
     body_text = driver.find_element(By.TAG_NAME, 'body').text
-    print("Body text received:", body_text)  # DEBUG: Show the raw response
 
     try:
         # Parse the body text as JSON
-        json_data = json.loads(body_text)
-
-        # Ensure the 'data' directory exists
-        os.makedirs('data', exist_ok=True)
-
-        # Save the parsed JSON data to a file
-        player_list_file = 'data/player_list.json'
-        with open(player_list_file, 'w') as json_file:
-            json.dump(json_data, json_file, indent=4)
-        print(f"Player list data saved to {player_list_file}")
-
-        # Load existing last_seen data if it exists
-        last_seen_file = 'data/last_seen.json'
-        if os.path.exists(last_seen_file):
-            with open(last_seen_file, 'r') as f:
-                last_seen_dict = json.load(f)
-        else:
-            last_seen_dict = {}  # Initialize an empty dictionary if the file doesn't exist
-
-        # Get the syncTime from the fetched JSON data
-        sync_time = json_data.get("syncTime")
-
-        # Update or add character names in last_seen_dict
-        for player in json_data.get("players", []):
-            character_name = player.get("characterName")
-            if character_name:
-                last_seen_dict[character_name] = sync_time  # Update or add the entry
-
-        # Save updated last_seen data back to the JSON file
-        with open(last_seen_file, 'w') as f:
-            json.dump(last_seen_dict, f, indent=4)
-        print(f"Last seen data saved to {last_seen_file}")
-
+        with SCRAPE_DURATION.time(phase="save"):
+            json_data = json.loads(body_text)
+            save_snapshot(json_data)
+        startup_profile.mark("first_scrape")
     except json.JSONDecodeError as e:
         print(f"Failed to decode JSON: {e}")
-        return False  # Indicate failure in fetching/parsing JSON data
+        SCRAPES.inc(result="invalid_json")
+        return None  # Indicate failure in fetching/parsing JSON data
+
+    SCRAPES.inc(result="ok")
 
-    return True  # Indicate success
+    return json_data
 
 def refresh_page(driver):
-    """Refresh both the API and forum pages with error handling."""
-    print("Refreshing the pages...")
+    """Reload the player list API page; an expired session shows up as a failed fetch."""
+    print("Refreshing the player list...")
     try:
-        # First check if we're still logged in
-        driver.get("https://ucp.ls-rp.com/")
-        if "Forbidden" in driver.page_source:
-            print("Session expired, attempting to relogin...")
-            driver.quit()
-            new_driver = login_ucp()
-            if new_driver:
-                return new_driver
-            return None
-        
-        # If still logged in, refresh the API page
-        driver.get("https://ucp.ls-rp.com/api/sa/player-list")
-        if "403 Forbidden" in driver.page_source:
-            print("Lost access to API, attempting to relogin...")
-            driver.quit()
-            new_driver = login_ucp()
-            if new_driver:
-                return new_driver
-            return None
-            
+        driver.get(PLAYER_LIST_URL)
         return driver
     except Exception as e:
         print(f"Error during page refresh: {e}")
         try:
             driver.quit()
-        except:
+        except Exception:
             pass
         return None
 
+def parse_sync_time(sync_time):
+    """Convert a UCP syncTime string to a UTC epoch timestamp."""
+    try:
+        return datetime.fromisoformat(sync_time.replace('Z', '+00:00')).replace(tzinfo=timezone.utc).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+class SyncScheduler:
+    """Learn the upstream syncTime cadence and schedule each fetch just after the next sync.
+
+    The publish delay (clock skew plus the time upstream takes to publish a sync)
+    is bracketed by fetch start times: a fetch that got a new sync bounds it from
+    above, one that still got the previous sync bounds it from below. Fetches aim
+    at the upper bound, probing halfway between the bounds while they are apart.
+    """
+
+    HISTORY = 8  # Sync intervals remembered
+    MIN_DELAY = 5
+    MAX_DELAY = 600
+    PROBE_PRECISION = 2  # Seconds of publish delay uncertainty not worth probing for
+    LOWER_BOUND_SYNCS = 30  # Syncs before the lower bound is dropped, so a shrinking delay is noticed
+
+    def __init__(self):
+        self.last_sync = None  # Epoch of the newest syncTime seen
+        self.intervals = deque(maxlen=self.HISTORY)
+        self.upper = None  # Publish delay is at most this many seconds after syncTime
+        self.lower = None  # ... and more than this many
+        self.lower_age = 0  # Syncs since the lower bound was reset
+        self.duplicates = 0  # Consecutive fetches that returned an unchanged syncTime
+        self.late = 0  # Duplicates fetched after the upper bound, i.e. upstream really is late
+
+    @property
+    def period(self):
+        if not self.intervals:
+            return None
+        ordered = sorted(self.intervals)
+        return ordered[len(ordered) // 2]
+
+    def raise_lower(self, bound):
+        self.lower = bound if self.lower is None else max(self.lower, bound)
+        if self.upper is not None and self.lower >= self.upper:
+            # The delay grew (or request latency fooled us), look just past the new lower bound
+            self.upper = self.lower + self.PROBE_PRECISION
+
+    def observe(self, sync_time, fetched_at=None):
+        """Record the syncTime of a fetch started at epoch `fetched_at`. Returns False when it was a duplicate snapshot."""
+        sync_ts = parse_sync_time(sync_time)
+        if sync_ts is None:
+            return True
+        if self.last_sync is not None and sync_ts <= self.last_sync:
+            self.duplicates += 1
+            period = self.period
+            if fetched_at is not None and period:
+                waited = fetched_at - (self.last_sync + period)
+                if self.upper is not None and waited >= self.upper:
+                    self.late += 1
+                # Later than a period past the expected sync means upstream skipped one, not a longer delay
+                if waited < period:
+                    self.raise_lower(waited)
+            return False
+
+        if self.last_sync is not None:
+            gap = sync_ts - self.last_sync
+            period = self.period
+            # A gap spanning several syncs means we missed some, count it per sync
+            missed = max(1, round(gap / period)) if period else 1
+            self.intervals.append(gap / missed)
+        self.last_sync = sync_ts
+        self.duplicates = 0
+        self.late = 0
+
+        self.lower_age += 1
+        if self.lower_age > self.LOWER_BOUND_SYNCS:
+            self.lower = None
+            self.lower_age = 0
+        if fetched_at is not None:
+            bound = fetched_at - sync_ts
+            self.upper = bound if self.upper is None else min(self.upper, bound)
+            if self.lower is not None:
+                self.lower = min(self.lower, self.upper)
+            if self.period:
+                # The sync after this one was not out yet either
+                self.raise_lower(bound - self.period)
+        return True
+
+    def next_delay(self, now=None):
+        """Seconds to sleep before the next fetch."""
+        period = self.period
+        if self.last_sync is None or period is None:
+            return DEFAULT_REFRESH_INTERVAL
+
+        now = time.time() if now is None else now
+        expected = self.last_sync + period
+        if self.upper is None:
+            target = expected + SYNC_GRACE
+        else:
+            target = expected + self.upper
+            if self.lower is not None:
+                # Delays that already passed can't be probed anymore
+                lower = max(self.lower, now - expected)
+                if self.upper - lower > self.PROBE_PRECISION:
+                    target = expected + (lower + self.upper) / 2
+
+        if target <= now:
+            if self.late or (self.upper is None and self.duplicates):
+                # Fetched after the sync should have been out and it wasn't, upstream is late: back off
+                delay = SYNC_GRACE * (2 ** max(self.late, self.duplicates if self.upper is None else 0))
+                return max(self.MIN_DELAY, min(delay, period, self.MAX_DELAY))
+            if not self.duplicates:
+                while target <= now:
+                    target += period
+        return max(self.MIN_DELAY, min(target - now, self.MAX_DELAY))
+
+class ChromeWatchdog:
+    """Sample RSS and CPU of the chromedriver + Chrome process tree and decide when to recycle."""
+
+    LATENCY_WINDOW = 5  # Fetches compared before and after each recycle
+
+    def __init__(self):
+        self.enabled = psutil is not None
+        self.recycle_count = 0
+        self.cpu_strikes = 0
+        self.fetch_latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self.pending_report = None  # Recycle still waiting for post-recycle latencies
+        self._processes = {}  # pid -> psutil.Process, kept so cpu_percent has a baseline
+        if not self.enabled:
+            print("psutil is not installed, Chrome resource watchdog disabled.")
+
+    def _process_tree(self, driver):
+        """Return chromedriver, the Chrome browser and all of their children."""
+        root_pids = []
+        service = getattr(driver, 'service', None)
+        if service is not None and getattr(service, 'process', None) is not None:
+            root_pids.append(service.process.pid)
+        if getattr(driver, 'browser_pid', None):
+            root_pids.append(driver.browser_pid)  # undetected_chromedriver starts Chrome itself
+
+        processes = {}
+        for pid in root_pids:
+            try:
+                root = psutil.Process(pid)
+                for proc in [root] + root.children(recursive=True):
+                    # Reuse the cached object so cpu_percent measures since the last sample
+                    processes[proc.pid] = self._processes.get(proc.pid, proc)
+            except psutil.Error:
+                continue
+        self._processes = processes
+        return list(processes.values())
+
+    def sample(self, driver):
+        """Return (rss_mb, cpu_percent) summed over the browser process tree."""
+        rss = 0
+        cpu = 0.0
+        for proc in self._process_tree(driver):
+            try:
+                rss += proc.memory_info().rss
+                cpu += proc.cpu_percent(interval=None)
+            except psutil.Error:
+                continue
+        return rss / (1024 * 1024), cpu
+
+    def check(self, driver):
+        """Sample the browser and return the reason it should be recycled, or None."""
+        if not self.enabled or driver is None:
+            return None
+        rss_mb, cpu = self.sample(driver)
+        print(f"Chrome watchdog: rss={rss_mb:.0f} MB cpu={cpu:.0f}% over {len(self._processes)} processes")
+
+        if rss_mb >= CHROME_RSS_LIMIT_MB:
+            return f"RSS {rss_mb:.0f} MB >= {CHROME_RSS_LIMIT_MB} MB"
+        if cpu >= CHROME_CPU_LIMIT_PERCENT:
+            self.cpu_strikes += 1
+            if self.cpu_strikes >= CHROME_CPU_STRIKES:
+                return f"CPU {cpu:.0f}% >= {CHROME_CPU_LIMIT_PERCENT:.0f}% for {self.cpu_strikes} samples"
+        else:
+            self.cpu_strikes = 0
+        return None
+
+    def record_fetch(self, seconds):
+        """Track fetch latency and report how the last recycle affected it."""
+        self.fetch_latencies.append(seconds)
+        if self.pending_report and len(self.fetch_latencies) >= self.LATENCY_WINDOW:
+            number, reason, before = self.pending_report
+            after = sum(self.fetch_latencies) / len(self.fetch_latencies)
+            change = ((after - before) / before * 100) if before else 0.0
+            print(f"Chrome recycle #{number} ({reason}): fetch latency {before * 1000:.0f} ms -> "
+                  f"{after * 1000:.0f} ms ({change:+.0f}%)")
+            self.pending_report = None
+
+    def note_recycle(self, reason):
+        self.recycle_count += 1
+        before = (sum(self.fetch_latencies) / len(self.fetch_latencies)) if self.fetch_latencies else 0.0
+        self.pending_report = (self.recycle_count, reason, before)
+        self.fetch_latencies.clear()
+        self.cpu_strikes = 0
+        self._processes = {}
+
+def recycle_driver(driver, watchdog, reason):
+    """Replace the browser right after a successful poll so no fetch is lost."""
+    print(f"Recycling Chrome: {reason}")
+    save_cookies(driver)
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    watchdog.note_recycle(reason)
+    CHROME_RECYCLES.inc()
+    return start_session()
+
 def main():
+    load_browser_modules()
+    startup_profile.report_imports()
+    metrics.start_http_server('METRICS_PORT_SCRAPER')
     verification_failure_count = 0
     MAX_VERIFICATION_FAILURES = 3
+    watchdog = ChromeWatchdog()
+    scheduler = SyncScheduler()
+    signal.signal(signal.SIGTERM, handle_sigterm)
     
     while True:
         try:
-            driver = login_ucp()
+            driver = start_session()
             if driver:
-                session_start_time = time.time()  # Track when the session started
                 verification_failure_count = 0  # Reset verification failure count on successful login
+                fetch_started = None  # The first page was loaded by the login, at an unknown time
                 try:
-                    # Refresh every 2 minutes - this is a good balance between:
-                    # - Getting timely updates
-                    # - Not overwhelming the server
-                    # - Avoiding rate limits
-                    refresh_interval = 120  # 2 minutes in seconds
                     while True:
-                        current_time = time.time()
-
-                        if current_time - session_start_time >= SESSION_REFRESH_INTERVAL:
-                            print("Session expired, re-logging in.")
-                            driver.quit()
-                            driver = login_ucp()
-                            if not driver:
-                                print("Re-login failed after session expiry. Exiting.")
-                                break
-                            session_start_time = current_time
-
                         # Fetch data and update last_seen.json
-                        success = fetch_and_save_json_data(driver)
-                        if success:
+                        json_data = fetch_and_save_json_data(driver)
+                        if json_data is not None:
                             print("Data fetched and saved successfully.")
+                            if not scheduler.observe(json_data.get("syncTime"), fetch_started):
+                                print(f"Snapshot unchanged since last fetch ({scheduler.duplicates} in a row).")
+                            save_cookies(driver)  # Keep the serialized session in sync with the profile
+
+                            # Recycle between polls, the next fetch runs on the fresh browser
+                            recycle_reason = watchdog.check(driver)
+                            if recycle_reason:
+                                driver = recycle_driver(driver, watchdog, recycle_reason)
+                                if not driver:
+                                    print("Could not restart Chrome after recycling. Restarting browser session...")
+                                    break
                         else:
-                            print("403 Forbidden detected, re-logging in.")
-                            driver.quit()
-                            driver = login_ucp()
-                            if not driver:
-                                print("Re-login failed after 403 Forbidden. Exiting.")
-                                break
-                            session_start_time = time.time()
-
-                        time.sleep(refresh_interval)
-                        refresh_page(driver)
+                            # Only re-login once the session is really gone
+                            if session_is_valid(driver):
+                                print("Fetch failed but the session is still valid, retrying next cycle.")
+                            else:
+                                print("Session expired, re-logging in.")
+                                driver = login_ucp(driver)
+                                if not driver:
+                                    print("Re-login failed after session expiry. Exiting.")
+                                    break
+
+                        # Fetch shortly after the next expected upstream sync
+                        delay = scheduler.next_delay()
+                        period = scheduler.period
+                        print(f"Next fetch in {delay:.0f}s (sync period: {f'{period:.0f}s' if period else 'unknown'})")
+                        time.sleep(delay)
+                        fetch_start = time.monotonic()
+                        fetch_started = time.time()  # When upstream sees the request, before the page load and wait
+                        driver = refresh_page(driver)
+                        if not driver:
+                            SCRAPES.inc(result="refresh_failed")
+                            print("Browser lost during refresh. Restarting browser session...")
+                            break
+                        watchdog.record_fetch(time.monotonic() - fetch_start)
+                        SCRAPE_DURATION.observe(time.monotonic() - fetch_start, phase="page_load")
 
                 except (NoSuchWindowException, WebDriverException) as e:
                     print(f"Selenium browser error: {e}. Restarting browser session...")
@@ -301,7 +768,7 @@ def main():
                             # Send Discord notification
                             asyncio.run_coroutine_threadsafe(
                                 send_discord_notification(message),
-                                discord_loop
+                                get_discord_loop()
                             )
                             time.sleep(300)  # Wait 5 minutes before trying again
                             verification_failure_count = 0
@@ -314,6 +781,8 @@ def main():
                     print("Process interrupted by user.")
                     break
                 finally:
+                    # Before quitting Chrome, which can outlast the supervisor's stop timeout
+                    save_population()
                     print("Closing the browser.")
                     try:
                         driver.quit()
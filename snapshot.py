@@ -0,0 +1,410 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import time
+import threading
+from datetime import datetime, timezone
+
+# Binary player list snapshot shared by setup_db.py (writer) and bot.py (readers).
+#
+# Layout (little endian):
+#   header   magic, format version, flag count, seqlock, syncTime, player count,
+#            string count, section offsets, payload size, content hash
+#   strings  u32 offset table (string count + 1 entries) followed by UTF-8 data,
+#            every character/account name is stored once
+#   names    u32 string index per player, rows sorted by character name
+#   accounts u32 string index per player, NO_STRING when the account is hidden
+#   flags    one u8 column per entry of FLAGS, player count bytes each
+#
+# The writer bumps the seqlock to an odd value, rewrites the file in place and
+# bumps it back to even. Readers retry until they see the same even value
+# before and after reading, so they never return a torn snapshot. When the new
+# payload does not fit, the writer atomically replaces the file and readers
+# remap it after noticing the new inode.
+
+MAGIC = b'LSPS'
+FORMAT_VERSION = 1
+FLAGS = ("isAdmin", "isTester", "isDeveloper", "isPremium", "hideAccountName", "isPolice", "isMedic")
+NO_STRING = 0xFFFFFFFF
+MIN_FILE_SIZE = 64 * 1024
+
+HEADER = struct.Struct('<4sHHQdIIIIIIII16s')
+SEQ_OFFSET = 8  # Byte offset of the seqlock within the header
+SEQ = struct.Struct('<Q')
+SYNC_TIME = struct.Struct('<d')
+SYNC_TIME_OFFSET = 16
+
+def parse_sync_time(sync_time):
+    """Convert a UCP syncTime string to a UTC epoch timestamp (0.0 when unknown)."""
+    try:
+        return datetime.fromisoformat(sync_time.replace('Z', '+00:00')).replace(tzinfo=timezone.utc).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0
+
+def format_sync_time(timestamp):
+    """Convert an epoch timestamp back to the syncTime string format."""
+    if not timestamp:
+        return None
+    dt = datetime.fromtimestamp(timestamp, timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+def snapshot_rows(json_data):
+    """Players in snapshot row order: named players only, sorted by character name."""
+    return sorted(
+        (p for p in json_data.get("players", []) if p.get("characterName")),
+        key=lambda p: p["characterName"].encode('utf-8'),
+    )
+
+def visible_account(player):
+    """The account name, or None when the player hides it."""
+    return None if player.get("hideAccountName") or not player.get("accountName") else player["accountName"]
+
+def build_payload(json_data, players_hash=None):
+    """Encode a player list into (header fields, payload bytes)."""
+    players = snapshot_rows(json_data)
+
+    # Intern every name so repeated account names are stored once
+    strings = {}
+    def intern(value):
+        encoded = value.encode('utf-8')
+        if encoded not in strings:
+            strings[encoded] = len(strings)
+        return strings[encoded]
+
+    name_column = [intern(p["characterName"]) for p in players]
+    account_column = [NO_STRING if visible_account(p) is None else intern(p["accountName"]) for p in players]
+
+    string_offsets = []
+    position = 0
+    for encoded in strings:
+        string_offsets.append(position)
+        position += len(encoded)
+    string_offsets.append(position)
+    string_data = b''.join(strings)
+
+    count = len(players)
+    strings_offset = HEADER.size
+    string_data_offset = strings_offset + 4 * len(string_offsets)
+    names_offset = string_data_offset + len(string_data)
+    names_offset += -names_offset % 4  # Keep the u32 columns aligned
+    accounts_offset = names_offset + 4 * count
+    flags_offset = accounts_offset + 4 * count
+
+    payload = bytearray(flags_offset + len(FLAGS) * count - HEADER.size)
+    def put(offset, data):
+        payload[offset - HEADER.size:offset - HEADER.size + len(data)] = data
+
+    put(strings_offset, struct.pack(f'<{len(string_offsets)}I', *string_offsets))
+    put(string_data_offset, string_data)
+    put(names_offset, struct.pack(f'<{count}I', *name_column))
+    put(accounts_offset, struct.pack(f'<{count}I', *account_column))
+    for column, flag in enumerate(FLAGS):
+        put(flags_offset + column * count, bytes(1 if p.get(flag) else 0 for p in players))
+
+    digest = bytes.fromhex(players_hash)[:16] if players_hash else b'\0' * 16
+    fields = (
+        parse_sync_time(json_data.get("syncTime")), count, len(strings),
+        strings_offset, string_data_offset, names_offset, accounts_offset, flags_offset,
+        len(payload), digest,
+    )
+    return fields, bytes(payload)
+
+def _read_header(buffer):
+    header = HEADER.unpack_from(buffer, 0)
+    if header[0] != MAGIC or header[1] != FORMAT_VERSION or header[2] != len(FLAGS):
+        return None
+    return header
+
+def write_snapshot(path, json_data, players_hash=None):
+    """Publish a player list, in place under the seqlock when it fits the existing file."""
+    fields, payload = build_payload(json_data, players_hash)
+    needed = HEADER.size + len(payload)
+
+    try:
+        with open(path, 'r+b') as f:
+            if os.fstat(f.fileno()).st_size >= needed:
+                with mmap.mmap(f.fileno(), 0) as mm:
+                    header = _read_header(mm)
+                    if header is not None:
+                        seq = header[3] | 1  # Recover from a writer that died mid-update
+                        SEQ.pack_into(mm, SEQ_OFFSET, seq)
+                        mm[HEADER.size:needed] = payload
+                        HEADER.pack_into(mm, 0, MAGIC, FORMAT_VERSION, len(FLAGS), seq, *fields)
+                        SEQ.pack_into(mm, SEQ_OFFSET, seq + 1)
+                        mm.flush()
+                        return
+    except FileNotFoundError:
+        pass
+
+    # Grow geometrically so in-place updates stay the common case
+    size = MIN_FILE_SIZE
+    while size < needed:
+        size *= 2
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(FLAGS), 2, *fields))
+        f.write(payload)
+        f.truncate(size)
+    os.replace(tmp_path, path)
+
+def update_sync_time(path, sync_time):
+    """Advance the syncTime of an unchanged snapshot without rewriting it."""
+    try:
+        with open(path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+            header = _read_header(mm)
+            if header is None:
+                return False
+            seq = header[3] | 1
+            SEQ.pack_into(mm, SEQ_OFFSET, seq)
+            SYNC_TIME.pack_into(mm, SYNC_TIME_OFFSET, parse_sync_time(sync_time))
+            SEQ.pack_into(mm, SEQ_OFFSET, seq + 1)
+            return True
+    except (FileNotFoundError, ValueError):
+        return False
+
+BIT_DIGITS = bytes.maketrans(b'\0\1', b'01')
+
+def column_bitset(column):
+    """Turn a column of 0/1 bytes into an int with bit i set for row i."""
+    return int(bytes(column).translate(BIT_DIGITS)[::-1], 2) if column else 0
+
+class FlagIndex:
+    """Online players as parallel name/account arrays plus one bitset per flag, bit i being row i."""
+
+    def __init__(self, names, accounts, columns):
+        self.names = names
+        self.accounts = accounts  # None where the account is not known
+        self.bitsets = {flag: column_bitset(column) for flag, column in zip(FLAGS, columns)}
+        self.all = (1 << len(names)) - 1
+
+    @classmethod
+    def from_player_data(cls, player_data):
+        """Same rows and accounts as a binary snapshot of the player list, so both sources show the same."""
+        players = snapshot_rows(player_data)
+        columns = [bytearray(len(players)) for _ in FLAGS]
+        for row, player in enumerate(players):
+            for column, flag in enumerate(FLAGS):
+                if player.get(flag):
+                    columns[column][row] = 1
+        return cls([p["characterName"] for p in players], [visible_account(p) for p in players], columns)
+
+    def __len__(self):
+        return len(self.names)
+
+    def count(self, flag):
+        return self.bitsets[flag].bit_count()
+
+    def select(self, groups):
+        """Bitset of the players matching any group, a group matching players with all of its flags."""
+        selected = 0
+        for group in groups:
+            bitset = self.all
+            for flag in group:
+                bitset &= self.bitsets[flag]
+            selected |= bitset
+        return selected
+
+    def rows(self, bitset):
+        """Row numbers set in a bitset, in ascending order."""
+        bits = bin(bitset)[:1:-1]
+        row = bits.find('1')
+        while row != -1:
+            yield row
+            row = bits.find('1', row + 1)
+
+class SnapshotReader:
+    """Read names and flags straight from the memory-mapped snapshot."""
+
+    MAX_RETRIES = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._mmap = None
+        self._inode = None
+        self._lock = threading.Lock()  # _map swaps the mapping, which threads sharing a reader must not see mid-read
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+        self._file = self._mmap = self._inode = None
+
+    def _map(self):
+        """Map the file, remapping when the writer replaced it."""
+        stat = os.stat(self.path)
+        if self._mmap is not None and stat.st_ino == self._inode:
+            return self._mmap
+        self.close()
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        return self._mmap
+
+    def _read(self, reader):
+        """Run reader(buffer, header) until it sees a consistent snapshot."""
+        with self._lock:
+            return self._read_consistent(reader)
+
+    def _read_consistent(self, reader):
+        for _ in range(self.MAX_RETRIES):
+            mm = self._map()
+            seq = SEQ.unpack_from(mm, SEQ_OFFSET)[0]
+            if seq & 1:
+                time.sleep(0)  # Writer in progress
+                continue
+            header = _read_header(mm)
+            if header is None:
+                raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} player snapshot")
+            try:
+                result = reader(memoryview(mm), header)
+            except (struct.error, IndexError, UnicodeDecodeError, ValueError, TypeError):
+                continue  # Only possible on a torn read, retry
+            if SEQ.unpack_from(mm, SEQ_OFFSET)[0] == seq:
+                return result
+        raise RuntimeError(f"Could not get a consistent read of {self.path}")
+
+    @staticmethod
+    def _string(buffer, header, index):
+        strings_offset, string_data_offset = header[7], header[8]
+        start, end = struct.unpack_from('<2I', buffer, strings_offset + 4 * index)
+        return bytes(buffer[string_data_offset + start:string_data_offset + end]).decode('utf-8')
+
+    def version(self):
+        """Return (content hash prefix, syncTime string) from the header only."""
+        return self._read(lambda buffer, header: (header[13].hex(), format_sync_time(header[4])))
+
+    def sync_time(self):
+        return self._read(lambda buffer, header: format_sync_time(header[4]))
+
+    def player_count(self):
+        return self._read(lambda buffer, header: header[5])
+
+    def names(self):
+        """All online character names, sorted."""
+        def read(buffer, header):
+            count, names_offset = header[5], header[9]
+            column = buffer[names_offset:names_offset + 4 * count].cast('I')
+            return [self._string(buffer, header, index) for index in column]
+        return self._read(read)
+
+    def flag_count(self, flag):
+        """Number of online players with the given flag set."""
+        column = FLAGS.index(flag)
+        def read(buffer, header):
+            count, flags_offset = header[5], header[11]
+            start = flags_offset + column * count
+            return bytes(buffer[start:start + count]).count(1)
+        return self._read(read)
+
+    def flag_index(self):
+        """Names, accounts and flag bitsets in one consistent read."""
+        def read(buffer, header):
+            # Only copy inside the seqlock, the bitsets are built once the read is known to be consistent
+            count, names_offset, accounts_offset, flags_offset = header[5], header[9], header[10], header[11]
+            names = buffer[names_offset:names_offset + 4 * count].cast('I')
+            accounts = buffer[accounts_offset:accounts_offset + 4 * count].cast('I')
+            return (
+                [self._string(buffer, header, index) for index in names],
+                [None if index == NO_STRING else self._string(buffer, header, index) for index in accounts],
+                [bytes(buffer[flags_offset + i * count:flags_offset + (i + 1) * count]) for i in range(len(FLAGS))],
+            )
+        return FlagIndex(*self._read(read))
+
+    def contains(self, character_name):
+        """Binary search the name-sorted rows for a character."""
+        target = character_name.encode('utf-8')
+        def read(buffer, header):
+            count, names_offset = header[5], header[9]
+            column = buffer[names_offset:names_offset + 4 * count].cast('I')
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                index = column[middle]
+                start, end = struct.unpack_from('<2I', buffer, header[7] + 4 * index)
+                value = bytes(buffer[header[8] + start:header[8] + end])
+                if value < target:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low == count:
+                return False
+            start, end = struct.unpack_from('<2I', buffer, header[7] + 4 * column[low])
+            return bytes(buffer[header[8] + start:header[8] + end]) == target
+        return self._read(read)
+
+    def to_player_data(self):
+        """Rebuild the player_list.json structure, for callers that need every field."""
+        def read(buffer, header):
+            sync_time, count = header[4], header[5]
+            names_offset, accounts_offset, flags_offset = header[9], header[10], header[11]
+            names = buffer[names_offset:names_offset + 4 * count].cast('I')
+            accounts = buffer[accounts_offset:accounts_offset + 4 * count].cast('I')
+            columns = [bytes(buffer[flags_offset + i * count:flags_offset + (i + 1) * count]) for i in range(len(FLAGS))]
+            players = []
+            for row in range(count):
+                player = {
+                    "accountName": None if accounts[row] == NO_STRING else self._string(buffer, header, accounts[row]),
+                    "characterName": self._string(buffer, header, names[row]),
+                }
+                for column, flag in enumerate(FLAGS):
+                    player[flag] = bool(columns[column][row])
+                players.append(player)
+            return {"syncTime": format_sync_time(sync_time), "players": players}
+        return self._read(read)
+
+def convert(json_path, snapshot_path):
+    """Convert a player_list.json file to the binary snapshot format."""
+    with open(json_path, 'r') as f:
+        json_data = json.load(f)
+    write_snapshot(snapshot_path, json_data)
+    print(f"Wrote {len(json_data.get('players', []))} players from {json_path} to {snapshot_path}")
+
+def benchmark(json_path, snapshot_path, iterations=200):
+    """Compare open/read/json.load against mmap reads for the common bot queries."""
+    if not os.path.exists(snapshot_path):
+        convert(json_path, snapshot_path)
+
+    def timed(label, func):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = (time.perf_counter() - start) / iterations
+        print(f"{label:<40} {elapsed * 1e6:10.1f} us/op")
+        return elapsed
+
+    def load_json():
+        with open(json_path, 'r') as f:
+            return json.load(f)
+
+    with open(json_path, 'r') as f:
+        sample = json.load(f)
+    probe = sample["players"][len(sample["players"]) // 2]["characterName"] if sample.get("players") else "Nobody_Here"
+
+    reader = SnapshotReader(snapshot_path)
+    print(f"{len(sample.get('players', []))} players, {iterations} iterations")
+    results = {
+        "json_names": timed("json: load + names", lambda: [p["characterName"] for p in load_json()["players"]]),
+        "mmap_names": timed("mmap: names", reader.names),
+        "json_contains": timed("json: load + lookup", lambda: any(p["characterName"] == probe for p in load_json()["players"])),
+        "mmap_contains": timed("mmap: contains", lambda: reader.contains(probe)),
+        "json_admins": timed("json: load + count admins", lambda: sum(p.get("isAdmin", False) for p in load_json()["players"])),
+        "mmap_admins": timed("mmap: count admins", lambda: reader.flag_count("isAdmin")),
+        "json_full": timed("json: full load", load_json),
+        "mmap_full": timed("mmap: to_player_data", reader.to_player_data),
+    }
+    reader.close()
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("convert", "bench"):
+        print("Usage: python snapshot.py convert|bench [player_list.json] [player_list.bin] [iterations]")
+        sys.exit(1)
+    json_path = sys.argv[2] if len(sys.argv) > 2 else 'data/player_list.json'
+    snapshot_path = sys.argv[3] if len(sys.argv) > 3 else 'data/player_list.bin'
+    if sys.argv[1] == "convert":
+        convert(json_path, snapshot_path)
+    else:
+        benchmark(json_path, snapshot_path, int(sys.argv[4]) if len(sys.argv) > 4 else 200)
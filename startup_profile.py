@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import builtins
+
+# Startup profiling for bot.py and setup_db.py, enabled with STARTUP_PROFILE=1.
+# Import this module first so the import hook sees every heavy dependency.
+ENABLED = os.getenv('STARTUP_PROFILE', '0') == '1'
+
+_origin = time.perf_counter()
+_original_import = builtins.__import__
+_depth = 0
+import_times = {}  # Top-level import name -> seconds, including everything it pulled in
+milestones = {}  # Milestone name -> seconds since the process started importing
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    # Only time the outermost import of a module that is not loaded yet
+    if _depth or level or name in sys.modules:
+        _depth += 1
+        try:
+            return _original_import(name, globals, locals, fromlist, level)
+        finally:
+            _depth -= 1
+
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        import_times[name] = import_times.get(name, 0.0) + time.perf_counter() - start
+
+def install():
+    """Start timing imports; a no-op unless STARTUP_PROFILE is enabled."""
+    if ENABLED and builtins.__import__ is not _timed_import:
+        builtins.__import__ = _timed_import
+
+def elapsed():
+    return time.perf_counter() - _origin
+
+def mark(milestone):
+    """Record the first time a milestone is reached."""
+    if not ENABLED or milestone in milestones:
+        return
+    milestones[milestone] = elapsed()
+    print(f"[startup] {milestone} reached after {milestones[milestone]:.2f}s")
+
+def report_imports(limit=15):
+    """Print the slowest imports and stop timing new ones."""
+    if not ENABLED:
+        return
+    builtins.__import__ = _original_import
+    total = sum(import_times.values())
+    print(f"[startup] imports took {total:.2f}s, slowest:")
+    for name, seconds in sorted(import_times.items(), key=lambda item: item[1], reverse=True)[:limit]:
+        print(f"[startup]   {name:<40} {seconds * 1000:8.1f} ms")
@@ -0,0 +1,220 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import logging
+
+# Interpreter used for the scraper scripts, defaults to the one running the bot
+SCRAPER_PYTHON = os.getenv('SCRAPER_PYTHON', sys.executable)
+PID_DIR = 'data'
+STREAM_LIMIT = 4 * 1024 * 1024  # Longest output line forwarded whole, longer ones are logged in chunks
+
+logger = logging.getLogger(__name__)
+
+def _pid_matches(pid, script):
+    """Check that a PID from a stale pid file still belongs to our script."""
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return script.encode() in f.read()
+    except OSError:
+        return False
+
+def _signal_group(pid, sig):
+    """Signal the child's whole process group (the child, chromedriver, Chrome...)."""
+    try:
+        os.killpg(pid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        logger.warning(f"Not allowed to signal process group {pid}")
+        return False
+
+class SupervisedProcess:
+    """Run one scraper script and restart it as soon as it exits, with crash-loop backoff."""
+
+    MIN_BACKOFF = 1
+    MAX_BACKOFF = 300
+    STABLE_UPTIME = 300  # A run this long resets the backoff
+    STOP_TIMEOUT = 10
+    DRAIN_TIMEOUT = 5  # Output left in the pipes after the child exits, e.g. from an orphaned chromedriver
+
+    def __init__(self, script):
+        self.script = script
+        self.name = os.path.splitext(os.path.basename(script))[0]
+        self.pid_file = os.path.join(PID_DIR, f'{self.name}.pid')
+        self.log = logging.getLogger(f'scraper.{self.name}')
+        self.process = None
+        self.started_at = None
+        self.first_started_at = None
+        self.restarts = 0
+        self.last_exit_code = None
+        self._task = None
+        self._forwarders = []  # Output forwarding tasks, the loop itself only keeps weak references
+        self._stopping = False
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.returncode is None
+
+    @property
+    def uptime(self):
+        return time.monotonic() - self.started_at if self.running else 0.0
+
+    def start(self):
+        """Start supervising; calling it again while supervised is a no-op."""
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._supervise(), name=f'supervise-{self.name}')
+
+    async def _supervise(self):
+        await self._kill_stale()
+        backoff = self.MIN_BACKOFF
+        while not self._stopping:
+            try:
+                await self._spawn()
+            except OSError as e:
+                logger.error(f"Could not start {self.script}: {e}")
+            else:
+                self.last_exit_code = await self.process.wait()
+                run_time = time.monotonic() - self.started_at
+                await self._stop_forwarders()
+                self._remove_pid_file()
+                if self._stopping:
+                    break
+                if run_time >= self.STABLE_UPTIME:
+                    backoff = self.MIN_BACKOFF
+                logger.warning(
+                    f"{self.script} exited with code {self.last_exit_code} after {run_time:.0f}s "
+                    f"(restarts: {self.restarts}), restarting in {backoff}s"
+                )
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+            self.restarts += 1
+
+    async def _spawn(self):
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        self.process = await asyncio.create_subprocess_exec(
+            SCRAPER_PYTHON, self.script,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,  # Own process group so cleanup never needs pkill
+            env=env,
+            limit=STREAM_LIMIT,
+        )
+        self.started_at = time.monotonic()
+        if self.first_started_at is None:
+            self.first_started_at = self.started_at
+        os.makedirs(PID_DIR, exist_ok=True)
+        with open(self.pid_file, 'w') as f:
+            f.write(str(self.process.pid))
+        logger.info(f"Started {self.script} (pid {self.process.pid}, restarts: {self.restarts})")
+        self._forwarders = [
+            asyncio.create_task(self._forward(self.process.stdout, logging.INFO)),
+            asyncio.create_task(self._forward(self.process.stderr, logging.WARNING)),
+        ]
+
+    async def _forward(self, stream, level):
+        """Feed the child's output into the logging pipeline line by line."""
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                # Line longer than the stream limit, log what is buffered and move on
+                line = await stream.read(STREAM_LIMIT)
+            if not line:
+                break
+            self.log.log(level, line.decode('utf-8', errors='replace').rstrip())
+
+    async def _stop_forwarders(self):
+        """Let the forwarders drain what the child wrote before exiting, then cancel them."""
+        forwarders = list(self._forwarders)
+        if not forwarders:
+            return
+        _, pending = await asyncio.wait(forwarders, timeout=self.DRAIN_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*forwarders, return_exceptions=True)
+        # stop() and _supervise can both get here for the same exit, keep references until all are done
+        self._forwarders = [task for task in self._forwarders if not task.done()]
+
+    async def _kill_stale(self):
+        """Stop a child left behind by a previous bot run, identified by its pid file."""
+        try:
+            with open(self.pid_file) as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            return
+        if _pid_matches(pid, self.script):
+            logger.info(f"Stopping stale {self.script} process group {pid}")
+            _signal_group(pid, signal.SIGTERM)
+            for _ in range(self.STOP_TIMEOUT * 10):
+                if not _pid_matches(pid, self.script):
+                    break
+                await asyncio.sleep(0.1)
+            else:
+                _signal_group(pid, signal.SIGKILL)
+        self._remove_pid_file()
+
+    def _remove_pid_file(self):
+        try:
+            os.remove(self.pid_file)
+        except OSError:
+            pass
+
+    async def stop(self):
+        """Stop supervising and terminate the child's process group."""
+        self._stopping = True
+        if self.running:
+            _signal_group(self.process.pid, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(self.process.wait(), self.STOP_TIMEOUT)
+                logger.info(f"{self.script} process terminated")
+            except asyncio.TimeoutError:
+                _signal_group(self.process.pid, signal.SIGKILL)
+                await self.process.wait()
+                logger.info(f"{self.script} process killed")
+        await self._stop_forwarders()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._remove_pid_file()
+
+    def kill(self):
+        """Synchronous last-resort cleanup for when the event loop is already gone."""
+        self._stopping = True
+        if self.process is not None and self.process.returncode is None:
+            _signal_group(self.process.pid, signal.SIGTERM)
+        self._remove_pid_file()
+
+    def status(self):
+        return {
+            "name": self.name,
+            "pid": self.process.pid if self.running else None,
+            "running": self.running,
+            "uptime": self.uptime,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+        }
+
+class ProcessSupervisor:
+    """Supervise a fixed set of scraper scripts."""
+
+    def __init__(self, scripts):
+        self.children = [SupervisedProcess(script) for script in scripts]
+
+    def start(self):
+        for child in self.children:
+            child.start()
+
+    async def stop(self):
+        await asyncio.gather(*(child.stop() for child in self.children), return_exceptions=True)
+
+    def kill(self):
+        for child in self.children:
+            child.kill()
+
+    def status(self):
+        return [child.status() for child in self.children]